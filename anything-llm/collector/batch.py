@@ -0,0 +1,148 @@
+import os, sys, json, time
+from scripts.utils import ada_v2_cost
+
+# Runs many sources from a job file in one process, so the interpreter, collectors, tokenizer, HTTP pool
+# and every cache in outputs/ are loaded once instead of once per source. Example jobs.yaml:
+#
+#   sources:
+#     - type: youtube
+#       url: https://www.youtube.com/@mintplex
+#     - type: substack
+#       url: https://swyx.substack.com/
+#     - type: medium
+#       url: https://medium.com/@yujiangtham
+#     - type: gitbook
+#       url: https://docs.gitbook.com
+#     - type: link
+#       urls:
+#         - https://tim.blog/2022/08/09/nft-insider-trading-policy/
+#
+# All `link` sources are fetched together so they share the link concurrency limits.
+SOURCE_TYPES = ['youtube', 'substack', 'medium', 'gitbook', 'link']
+
+# Returns why a source from the job file cannot be collected, or None if it is valid.
+def source_error(source):
+  if not isinstance(source, dict): return f"{source!r} is not a source - expected a mapping with a type and a url"
+  if source.get('type') not in SOURCE_TYPES: return f"{source.get('type')} is not a supported source type ({', '.join(SOURCE_TYPES)})"
+
+  url, urls = source.get('url'), source.get('urls')
+  if url is not None and (not isinstance(url, str) or url.strip() == ''): return f"{source.get('type')} source has an invalid url {url!r}"
+  if urls is not None:
+    if source.get('type') != 'link': return f"{source.get('type')} source takes a single url, not a list of urls"
+    if not isinstance(urls, list) or not all(isinstance(link, str) and link.strip() != '' for link in urls): return "link source urls must be a list of URLs"
+  if url is None and not urls: return f"{source.get('type')} source has no url"
+  return None
+
+def load_job(job_path):
+  with open(job_path, 'r', encoding='utf-8') as file:
+    if os.path.splitext(job_path)[1] in ['.yaml', '.yml']:
+      import yaml
+      job = yaml.safe_load(file)
+    else:
+      job = json.load(file)
+
+  sources = job.get('sources', []) if isinstance(job, dict) else job
+  if not isinstance(sources, list):
+    print(f"[BATCH]: {job_path} must contain a list of sources, optionally under a `sources` key.")
+    return []
+
+  valid_sources = []
+  for source in sources:
+    error = source_error(source)
+    if error is not None:
+      print(f"[BATCH]: {error} - skipping.")
+      continue
+    valid_sources.append(source)
+  return valid_sources
+
+def group_links(sources):
+  links = []
+  grouped = []
+  for source in sources:
+    if source.get('type') != 'link':
+      grouped.append((source.get('type'), source.get('url')))
+      continue
+    if source.get('url') is not None: links.append(source.get('url'))
+    links.extend(source.get('urls') or [])
+  if len(links) > 0: grouped.append(('link', [*dict.fromkeys(links)]))
+  return grouped
+
+def collector(source_type):
+  if source_type == 'youtube':
+    from scripts.youtube import collect_youtube
+    return collect_youtube
+  if source_type == 'substack':
+    from scripts.substack import collect_substack
+    return collect_substack
+  if source_type == 'medium':
+    from scripts.medium import collect_medium
+    return collect_medium
+  if source_type == 'gitbook':
+    from scripts.gitbook import collect_gitbook
+    return collect_gitbook
+  if source_type == 'link':
+    from scripts.link import collect_links
+    return collect_links
+
+def run_batch(job_path):
+  sources = group_links(load_job(job_path))
+  if len(sources) == 0:
+    print(f"[BATCH]: {job_path} has no sources to collect.")
+    return None
+
+  results = []
+  started = time.monotonic()
+  for source_type, target in sources:
+    label = f"{len(target)} links" if source_type == 'link' else target
+    print(f"\n[BATCH]: Collecting {source_type} {label}")
+    source_started = time.monotonic()
+    # Collectors still exit() on some fatal errors (e.g. a missing API key) - one bad source must not end the batch.
+    try:
+      result = collector(source_type)(target)
+    except SystemExit:
+      print(f"[BATCH]: {source_type} {label} stopped with a fatal error.")
+      result = None
+    except Exception as e:
+      print(f"[BATCH]: {source_type} {label} failed - {e}")
+      result = None
+    results.append((source_type, label, result, time.monotonic() - source_started))
+  return results, time.monotonic() - started
+
+def batch_summary(results, elapsed):
+  documents = sum(result.get('documents') for _, _, result, _ in results if result is not None)
+  tokens = sum(result.get('tokens') for _, _, result, _ in results if result is not None)
+  failed = len([result for _, _, result, _ in results if result is None])
+
+  lines = []
+  for source_type, label, result, seconds in results:
+    if result is None:
+      lines.append(f"[BATCH]: {source_type} {label} - failed after {seconds:.1f}s")
+      continue
+    if result.get('nothing_to_collect'):
+      lines.append(f"[BATCH]: {source_type} {label} - nothing to collect")
+      continue
+    lines.append(f"[BATCH]: {source_type} {label} - {result.get('documents')} documents, {result.get('tokens')} tokens in {seconds:.1f}s")
+  lines.append(f"[BATCH]: {len(results) - failed} of {len(results)} sources collected - {documents} documents, {tokens} tokens in {elapsed:.1f}s ({documents / max(elapsed, 0.001):.2f} documents/s, {tokens / max(elapsed, 0.001):.0f} tokens/s)")
+  lines.append(f"Your estimated cost to embed all of this data using OpenAI's text-embedding-ada-002 model at $0.0004 / 1K tokens will cost {ada_v2_cost(tokens)} using {tokens} tokens.")
+  return "\n".join(lines), failed
+
+def main():
+  if len(sys.argv) != 2:
+    print("Usage: python batch.py <jobs.yaml|jobs.json>")
+    exit(1)
+
+  outcome = run_batch(sys.argv[1])
+  if outcome is None: exit(1)
+
+  from scripts.render_policy import render_summary
+  from scripts.http_client import http_summary
+  summary, failed = batch_summary(*outcome)
+  print(f"\n\n////////////////////////////")
+  print(render_summary())
+  print(http_summary())
+  print(summary)
+  print(f"////////////////////////////\n\n")
+  exit(1 if failed > 0 else 0)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,43 @@
+import os, sys, time, tempfile
+
+# Usage: python benchmarks/html_extraction.py [page.html ...] [--runs N]
+# Compares the old tempfile + UnstructuredHTMLLoader round trip with html_to_text() and checks
+# both produce identical text. Without arguments a synthetic article is used.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from langchain.document_loaders import UnstructuredHTMLLoader
+from scripts.link_utils import html_to_text
+
+def sample_article(paragraphs=200):
+  body = "\n".join(f"<h2>Section {i}</h2><p>Paragraph {i} of a long article with <a href='#'>a link</a>, some <b>bold</b> text and unicode – café, naïve, 日本語.</p>" for i in range(paragraphs))
+  return f"<html><head><title>Sample</title><meta name='description' content='sample'></head><body><article>{body}</article></body></html>"
+
+def tempfile_to_text(html):
+  with tempfile.NamedTemporaryFile(mode = "w") as tmp:
+    tmp.write(html)
+    tmp.seek(0)
+    loader = UnstructuredHTMLLoader(tmp.name)
+    return loader.load()[0].page_content
+
+def best_of(method, html, runs):
+  timings = []
+  for _ in range(runs):
+    start = time.perf_counter()
+    result = method(html)
+    timings.append(time.perf_counter() - start)
+  return min(timings), result
+
+def main():
+  args = sys.argv[1:]
+  runs = 5
+  if '--runs' in args:
+    runs = int(args[args.index('--runs') + 1])
+    del args[args.index('--runs'):args.index('--runs') + 2]
+
+  pages = [(path, open(path, encoding='utf-8').read()) for path in args] or [('synthetic article', sample_article())]
+  for name, html in pages:
+    tempfile_time, expected = best_of(tempfile_to_text, html, runs)
+    memory_time, actual = best_of(html_to_text, html, runs)
+    print(f"{name}: tempfile {tempfile_time * 1000:.1f}ms, in-memory {memory_time * 1000:.1f}ms ({tempfile_time / memory_time:.2f}x) - output {'identical' if expected == actual else 'DIFFERS'}")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,37 @@
+import os, sys, time, subprocess
+
+# Usage: python benchmarks/startup.py [runs]
+# Compares a fresh interpreter importing the entry points against importing every collector
+# and converter up front (plus building the tokenizer), which is what startup used to cost.
+COLLECTOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CASES = [
+  ('interpreter only', "pass"),
+  ('main.py - eager imports', "import whaaaaat, scripts.youtube, scripts.link, scripts.substack, scripts.medium, scripts.gitbook, scripts.utils; scripts.utils.get_encoder()"),
+  ('main.py - lazy imports', "import main"),
+  ('watch.py - eager imports', "import scripts.watch.convert.as_text, scripts.watch.convert.as_markdown, scripts.watch.convert.as_pdf, scripts.watch.convert.as_docx, scripts.utils; scripts.utils.get_encoder()"),
+  ('watch.py - lazy imports', "import watch"),
+]
+
+def time_statement(statement, runs):
+  timings = []
+  for _ in range(runs):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', statement], cwd=COLLECTOR_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+      return None, result.stderr.strip().splitlines()[-1]
+    timings.append(time.perf_counter() - start)
+  timings.sort()
+  return timings, None
+
+def main():
+  runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+  print(f"Import time over {runs} runs (min / median):\n")
+  for name, statement in CASES:
+    timings, error = time_statement(statement, runs)
+    if error is not None:
+      print(f"{name:<28} failed - {error}")
+      continue
+    print(f"{name:<28} {timings[0] * 1000:8.0f}ms / {timings[len(timings) // 2] * 1000:8.0f}ms")
+
+if __name__ == "__main__":
+  main()
@@ -1,10 +1,8 @@
 import os
 from whaaaaat import prompt, Separator
-from scripts.youtube import youtube
-from scripts.link import link, links
-from scripts.substack import substack
-from scripts.medium import medium
-from scripts.gitbook import gitbook
+
+# Collectors are imported only once selected - each one pulls in heavy dependencies
+# (langchain, requests_html, BeautifulSoup, ...) that we do not want to pay for at startup.
 
 def main():
   if os.name == 'nt':
@@ -54,23 +52,29 @@ def main():
     ]
     method = prompt(questions).get('collector')
     if(method == 'Single URL'):
+      from scripts.link import link
       link()
       exit(0)
     if(method == 'Multiple URLs'):
+      from scripts.link import links
       links()
       exit(0)
 
   if(method == 'Abort'): exit(0)
   if(method == 'YouTube Channel'): 
+    from scripts.youtube import youtube
     youtube()
     exit(0)
   if(method == 'Substack'):
+    from scripts.substack import substack
     substack()
     exit(0)
   if(method == 'Medium'):
+    from scripts.medium import medium
     medium()
     exit(0)
   if(method == 'Gitbook'):
+    from scripts.gitbook import gitbook
     gitbook()
     exit(0)
 
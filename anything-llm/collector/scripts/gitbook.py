@@ -1,16 +1,31 @@
-import os, json
+import os
 from langchain.document_loaders import GitbookLoader
 from urllib.parse import urlparse
 from datetime import datetime
 from alive_progress import alive_it
-from .utils import tokenize
+from .utils import count_tokens_batch, ada_v2_cost
+from .http_client import get_session, http_summary
+from .output import add_chunks, write_document, write_log_copy
 from uuid import uuid4
 
 def gitbook():
   url = input("Enter the URL of the GitBook you want to collect: ")
+  result = collect_gitbook(url)
+  if result is None: exit(1)
+
+  print(http_summary())
+  print(f"[Success]: {result.get('documents')} pages fetched!")
+  print(f"\n\n////////////////////////////")
+  print(f"Your estimated cost to embed all of this data using OpenAI's text-embedding-ada-002 model at $0.0004 / 1K tokens will cost {ada_v2_cost(result.get('tokens'))} using {result.get('tokens')} tokens.")
+  print(f"////////////////////////////\n\n")
+  exit(0)
+
+# Non-interactive collection of a GitBook - returns the documents written and their tokens, or None if the
+# URL is not valid.
+def collect_gitbook(url):
   if(url == ''):
     print("Not a gitbook URL")
-    exit(1)
+    return None
 
   primary_source = urlparse(url)
   output_path = f"./outputs/gitbook-logs/{primary_source.netloc}"
@@ -19,7 +34,10 @@ def gitbook():
   if os.path.exists(output_path) == False:os.makedirs(output_path)
   if os.path.exists(transaction_output_dir) == False: os.makedirs(transaction_output_dir)
   loader = GitbookLoader(url, load_all_paths= primary_source.path in ['','/'])
-  for doc in alive_it(loader.load()):
+  loader.session = get_session()
+  docs = loader.load()
+  token_counts = count_tokens_batch([doc.page_content for doc in docs])
+  for doc, token_count in alive_it(zip(docs, token_counts), total=len(docs)):
     metadata = doc.metadata
     content = doc.page_content
     source = urlparse(metadata.get('source'))
@@ -34,11 +52,11 @@ def gitbook():
       "published": datetime.today().strftime('%Y-%m-%d %H:%M:%S'),
       "wordCount": len(content),
       'pageContent': content,
-      'token_count_estimate': len(tokenize(content))
+      'token_count_estimate': token_count
     }
+    data = add_chunks(data)
 
-    with open(f"{output_path}/{output_filename}", 'w', encoding='utf-8') as file:
-      json.dump(data, file, ensure_ascii=True, indent=4)
+    document_path = write_document(data, f"{transaction_output_dir}/{transaction_output_filename}")
+    write_log_copy(data, f"{output_path}/{output_filename}", document_path)
 
-    with open(f"{transaction_output_dir}/{transaction_output_filename}", 'w', encoding='utf-8') as file:
-      json.dump(data, file, ensure_ascii=True, indent=4)
+  return {'documents': len(docs), 'tokens': sum(token_counts)}
@@ -0,0 +1,141 @@
+import os, json, time, random, threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from requests_html import HTMLSession, AsyncHTMLSession
+from dotenv import load_dotenv
+load_dotenv()
+
+# Every scraper goes through the same pooled sessions so connections are kept alive and reused, and
+# all requests share the same timeouts, retries, rate limits and timing metrics:
+#   HTTP_TIMEOUT         - seconds before a request is abandoned when the caller sets no timeout (default 30)
+#   HTTP_MAX_RETRIES     - retries for connection errors, timeouts, 429 and 5xx responses (default 3)
+#   HTTP_POOL_SIZE       - keep-alive connections kept per host (default 16)
+#   HTTP_RATE_LIMIT      - requests per second across all hosts, 0 for unlimited (default 0)
+#   HTTP_HOST_RATE_LIMIT - requests per second to any one host, 0 for unlimited (default 10)
+DEFAULT_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 30))
+MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 16))
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+RETRY_METHODS = ['GET', 'HEAD', 'OPTIONS']
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+
+class RateLimiter:
+  def __init__(self, per_second):
+    self.interval = 1 / per_second if per_second > 0 else 0
+    self.next_at = 0
+    self.lock = threading.Lock()
+
+  def wait(self):
+    if self.interval == 0: return
+    with self.lock:
+      now = time.monotonic()
+      scheduled = max(now, self.next_at)
+      self.next_at = scheduled + self.interval
+    if scheduled > now: time.sleep(scheduled - now)
+
+global_limiter = RateLimiter(float(os.getenv('HTTP_RATE_LIMIT', 0)))
+host_limiters = {}
+metrics = {}
+_lock = threading.Lock()
+
+def host_limiter(host):
+  with _lock:
+    if host not in host_limiters:
+      host_limiters[host] = RateLimiter(float(os.getenv('HTTP_HOST_RATE_LIMIT', 10)))
+    return host_limiters[host]
+
+def record(host, started, retried = False, failed = False):
+  with _lock:
+    entry = metrics.setdefault(host, {'requests': 0, 'retries': 0, 'errors': 0, 'seconds': 0.0})
+    entry['requests'] += 1
+    entry['seconds'] += time.monotonic() - started
+    if retried: entry['retries'] += 1
+    if failed: entry['errors'] += 1
+
+# Full jitter - a random delay up to the exponential backoff - unless the server asked for a Retry-After.
+def backoff(attempt, response = None):
+  retry_after = response.headers.get('Retry-After') if response is not None else None
+  if retry_after is not None and retry_after.isdigit(): return min(int(retry_after), BACKOFF_MAX)
+  return random.uniform(0, min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX))
+
+class CollectorAdapter(HTTPAdapter):
+  def send(self, request, timeout = None, **kwargs):
+    host = urlparse(request.url).netloc
+    timeout = timeout if timeout is not None else DEFAULT_TIMEOUT
+    retryable = request.method in RETRY_METHODS
+    for attempt in range(MAX_RETRIES + 1):
+      global_limiter.wait()
+      host_limiter(host).wait()
+      started = time.monotonic()
+      last_attempt = attempt == MAX_RETRIES or retryable == False
+      try:
+        response = super().send(request, timeout=timeout, **kwargs)
+      except (requests.ConnectionError, requests.Timeout):
+        record(host, started, retried = not last_attempt, failed = last_attempt)
+        if last_attempt: raise
+        time.sleep(backoff(attempt))
+        continue
+
+      if response.status_code not in RETRY_STATUSES or last_attempt:
+        record(host, started, failed = response.status_code >= 400)
+        return response
+
+      record(host, started, retried = True)
+      response.close()
+      time.sleep(backoff(attempt, response))
+
+def mount(session):
+  adapter = CollectorAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+  session.mount('http://', adapter)
+  session.mount('https://', adapter)
+  return session
+
+_session = None
+def get_session():
+  global _session
+  with _lock:
+    if _session is None:
+      _session = mount(HTMLSession())
+    return _session
+
+def get_async_session(workers = None):
+  return mount(AsyncHTMLSession(workers=workers))
+
+# ETag/Last-Modified values of feeds we have a cached copy of, so refreshing them can be answered with a 304.
+VALIDATORS_PATH = "./outputs/http-cache/validators.json"
+
+def load_validators():
+  if os.path.exists(VALIDATORS_PATH) == False: return {}
+  with open(VALIDATORS_PATH, "r") as file:
+    return json.load(file)
+
+# Only revalidate when the caller still has the cached copy - otherwise a 304 would leave it with nothing.
+def conditional_get(url, revalidate = True):
+  headers = {}
+  with _lock:
+    validators = load_validators().get(url, {}) if revalidate else {}
+  if validators.get('etag') is not None: headers['If-None-Match'] = validators['etag']
+  if validators.get('last_modified') is not None: headers['If-Modified-Since'] = validators['last_modified']
+  return get_session().get(url, headers=headers)
+
+# Call once the response body has been cached, so a later 304 always has a copy to fall back on.
+def remember_validators(url, response):
+  etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+  with _lock:
+    validators = load_validators()
+    if etag is None and last_modified is None:
+      if validators.pop(url, None) is None: return
+    else:
+      validators[url] = {'etag': etag, 'last_modified': last_modified}
+
+    os.makedirs(os.path.dirname(VALIDATORS_PATH), exist_ok=True)
+    with open(VALIDATORS_PATH + ".tmp", 'w', encoding='utf-8') as file:
+      json.dump(validators, file, ensure_ascii=True, indent=2)
+    os.replace(VALIDATORS_PATH + ".tmp", VALIDATORS_PATH)
+
+def http_summary():
+  with _lock:
+    lines = [f"[HTTP]: {host} - {entry['requests']} requests, {entry['seconds'] / entry['requests'] * 1000:.0f}ms avg, {entry['retries']} retried, {entry['errors']} failed" for host, entry in sorted(metrics.items())]
+  return "\n".join(lines) if len(lines) > 0 else "[HTTP]: no requests made."
@@ -1,68 +1,43 @@
-import os, json, tempfile
+import os, asyncio
 from urllib.parse import urlparse
-from requests_html import HTMLSession
-from langchain.document_loaders import UnstructuredHTMLLoader
-from .link_utils import  append_meta
-from .utils import tokenize, ada_v2_cost
+from .link_utils import append_meta, meta_text
+from .render_policy import page_text, static_text, rendered_text, render_summary
+from .utils import count_tokens, ada_v2_cost
+from .http_client import get_session, get_async_session, http_summary
+from .output import add_chunks, write_document, write_log_copy
     
 # Example Channel URL https://tim.blog/2022/08/09/nft-insider-trading-policy/
 def link():
   print("[NOTICE]: The first time running this process it will download supporting libraries.\n\n")
   fqdn_link = input("Paste in the URL of an online article or blog: ")
+  result = collect_link(fqdn_link)
+  if result is None: exit(1)
+
+  print(render_summary())
+  print(http_summary())
+  print(f"\n\n[Success]: article or link content fetched!")
+  print(f"////////////////////////////")
+  print(f"Your estimated cost to embed this data using OpenAI's text-embedding-ada-002 model at $0.0004 / 1K tokens will cost {ada_v2_cost(result.get('tokens'))} using {result.get('tokens')} tokens.")
+  print(f"////////////////////////////")
+  exit(0)
+
+# Non-interactive collection of one link - returns the document written and its tokens, or None if the
+# link could not be collected.
+def collect_link(fqdn_link):
   if(len(fqdn_link) == 0):
     print("Invalid URL!")
-    exit(1)
+    return None
 
-  session = HTMLSession()
-  req = session.get(fqdn_link)
+  req = get_session().get(fqdn_link)
   if(req.ok == False):
     print("Could not reach this url!")
-    exit(1)
-  
-  req.html.render()
-  full_text = None
-  with tempfile.NamedTemporaryFile(mode = "w") as tmp:
-    tmp.write(req.html.html)
-    tmp.seek(0)
-    loader = UnstructuredHTMLLoader(tmp.name)
-    data = loader.load()[0]
-    full_text = data.page_content
-    tmp.close()
+    return None
   
-  link = append_meta(req, full_text, True)
-  if(len(full_text) > 0):
-    source = urlparse(req.url)
-    output_filename = f"website-{source.netloc}-{source.path.replace('/','_')}.json"
-    output_path = f"./outputs/website-logs"
-
-    transaction_output_filename = f"article-{source.path.replace('/','_')}.json"
-    transaction_output_dir = f"../server/documents/website-{source.netloc}"
-
-    if os.path.isdir(output_path) == False:
-      os.makedirs(output_path)
-
-    if os.path.isdir(transaction_output_dir) == False:
-      os.makedirs(transaction_output_dir)
-
-    full_text = append_meta(req, full_text)
-    tokenCount = len(tokenize(full_text))
-    link['pageContent'] = full_text
-    link['token_count_estimate'] = tokenCount
-
-    with open(f"{output_path}/{output_filename}", 'w', encoding='utf-8') as file:
-      json.dump(link, file, ensure_ascii=True, indent=4)
-
-    with open(f"{transaction_output_dir}/{transaction_output_filename}", 'w', encoding='utf-8') as file:
-      json.dump(link, file, ensure_ascii=True, indent=4)
-  else:
+  tokenCount = save_link(req, page_text(req))
+  if tokenCount is None:
     print("Could not parse any meaningful data from this link or url.")
-    exit(1)
-
-  print(f"\n\n[Success]: article or link content fetched!")
-  print(f"////////////////////////////")
-  print(f"Your estimated cost to embed this data using OpenAI's text-embedding-ada-002 model at $0.0004 / 1K tokens will cost {ada_v2_cost(tokenCount)} using {tokenCount} tokens.")
-  print(f"////////////////////////////")
-  exit(0)
+    return None
+  return {'documents': 1, 'tokens': tokenCount}
 
 def links():
   links = []
@@ -79,61 +54,132 @@ def links():
     links.append(new_link)
     prompt = f"\n{len(links)} links in queue. Submit an empty value when done pasting in links to execute collection.\nPaste in the next URL of an online article or blog: "
 
+  result = collect_links(links)
+  if result is None: exit(1)
+
+  print(render_summary())
+  print(http_summary())
+  print(f"\n\n[Success]: {result.get('documents')} article or link contents fetched!")
+  print(f"////////////////////////////")
+  print(f"Your estimated cost to embed this data using OpenAI's text-embedding-ada-002 model at $0.0004 / 1K tokens will cost {ada_v2_cost(result.get('tokens'))} using {result.get('tokens')} tokens.")
+  print(f"////////////////////////////")
+  exit(0)
+
+# Non-interactive collection of many links at once - see fetch_links.
+def collect_links(links):
   if(len(links) == 0):
     print("No valid links provided!")
-    exit(1)
-
-  totalTokens = 0
-  for link in links:
-    print(f"Working on {link}...")
-    session = HTMLSession()
-    req = session.get(link)
-    if(req.ok == False):
+    return None
+
+  token_counts = asyncio.run(fetch_links(
+    links,
+    concurrency=int(os.getenv('LINK_CONCURRENCY', 4)),
+    host_concurrency=int(os.getenv('LINK_HOST_CONCURRENCY', 2)),
+    timeout=float(os.getenv('LINK_TIMEOUT', 60)),
+  ))
+  return {'documents': len([count for count in token_counts if count > 0]), 'tokens': sum(token_counts)}
+
+# Fetches many links at once. Pages that need JS rendering (see render_policy) share a single headless
+# browser and every render opens its own tab, so `concurrency` is also the maximum number of open tabs.
+# `host_concurrency` keeps us polite to any one site. Returns the token count of each link, 0 for links that failed.
+async def fetch_links(links, concurrency=4, host_concurrency=2, timeout=60):
+  session = get_async_session(workers=concurrency)
+  browser_lock = asyncio.Lock()
+  limit = asyncio.Semaphore(concurrency)
+  host_limits = {}
+  loop = asyncio.get_running_loop()
+
+  async def fetch(link):
+    host_limit = host_limits.setdefault(urlparse(link).netloc, asyncio.Semaphore(host_concurrency))
+    async with host_limit, limit:
+      print(f"Working on {link}...")
+      try:
+        req, full_text = await asyncio.wait_for(render_link(session, link, browser_lock), timeout)
+      except asyncio.TimeoutError:
+        print(f"Timed out fetching {link} after {timeout}s - skipping!")
+        return 0
+      except Exception as e:
+        print(f"Could not fetch {link} ({e}) - skipping!")
+        return 0
+
+    if req is None:
       print(f"Could not reach {link} - skipping!")
-      continue
-    
-    req.html.render()
-    full_text = None
-    with tempfile.NamedTemporaryFile(mode = "w") as tmp:
-      tmp.write(req.html.html)
-      tmp.seek(0)
-      loader = UnstructuredHTMLLoader(tmp.name)
-      data = loader.load()[0]
-      full_text = data.page_content
-      tmp.close()
-  
-    link = append_meta(req, full_text, True)
-    if(len(full_text) > 0):
-      source = urlparse(req.url)
-      output_filename = f"website-{source.netloc}-{source.path.replace('/','_')}.json"
-      output_path = f"./outputs/website-logs"
+      return 0
 
-      transaction_output_filename = f"article-{source.path.replace('/','_')}.json"
-      transaction_output_dir = f"../server/documents/website-{source.netloc}"
+    tokenCount = await loop.run_in_executor(None, save_link, req, full_text)
+    if tokenCount is None:
+      print(f"Could not parse any meaningful data from {link}.")
+      return 0
+    return tokenCount
+
+  try:
+    return await asyncio.gather(*[fetch(link) for link in links])
+  finally:
+    await session.close()
+
+# Text extraction is CPU bound, so it runs in a worker thread to keep the other fetches going.
+async def render_link(session, link, browser_lock):
+  loop = asyncio.get_running_loop()
+  req = await session.get(link)
+  if(req.ok == False):
+    req.close()
+    return None, None
+
+  full_text, needs_render = await loop.run_in_executor(None, static_text, req)
+  if needs_render == False: return req, full_text
+
+  try:
+    # The browser is launched by the first page that needs it and shared by every later render.
+    async with browser_lock:
+      await session.browser
+    # Cancelling arender part-way (e.g. when fetch_links times out) would leave its tab open, so the render
+    # is shielded and keeps its page, which is closed as soon as the render is over either way.
+    render = asyncio.ensure_future(req.html.arender(keep_page=True))
+    render.add_done_callback(lambda _: release_render(render, req.html))
+    await asyncio.shield(render)
+  except BaseException:
+    req.close()
+    raise
+  return req, await loop.run_in_executor(None, rendered_text, req, full_text)
+
+def release_render(render, html):
+  # A render that fails after its caller timed out has nobody left to report to.
+  if not render.cancelled(): render.exception()
+  asyncio.ensure_future(close_page(html))
+
+async def close_page(html):
+  page, html.page = html.page, None
+  if page is None: return
+  try:
+    await page.close()
+  except Exception:
+    pass  # The browser is already gone, and the tab with it
+
+# Writes a fetched page and its extracted text. Returns its token count or None if there was no content.
+def save_link(req, full_text):
+  link = append_meta(req, full_text, True)
+  if(len(full_text) == 0): return None
 
-      if os.path.isdir(output_path) == False:
-        os.makedirs(output_path)
+  source = urlparse(req.url)
+  output_filename = f"website-{source.netloc}-{source.path.replace('/','_')}.json"
+  output_path = f"./outputs/website-logs"
 
-      if os.path.isdir(transaction_output_dir) == False:
-        os.makedirs(transaction_output_dir)
+  transaction_output_filename = f"article-{source.path.replace('/','_')}.json"
+  transaction_output_dir = f"../server/documents/website-{source.netloc}"
 
-      full_text = append_meta(req, full_text)
-      tokenCount = len(tokenize(full_text))
-      link['pageContent'] = full_text
-      link['token_count_estimate'] = tokenCount
-      totalTokens += tokenCount
+  if os.path.isdir(output_path) == False:
+    os.makedirs(output_path, exist_ok=True)
 
-      with open(f"{output_path}/{output_filename}", 'w', encoding='utf-8') as file:
-        json.dump(link, file, ensure_ascii=True, indent=4)
+  if os.path.isdir(transaction_output_dir) == False:
+    os.makedirs(transaction_output_dir, exist_ok=True)
 
-      with open(f"{transaction_output_dir}/{transaction_output_filename}", 'w', encoding='utf-8') as file:
-        json.dump(link, file, ensure_ascii=True, indent=4)
-    else:
-      print(f"Could not parse any meaningful data from {link}.")
-      continue
+  full_text = meta_text(link, full_text)
+  tokenCount = count_tokens(full_text)
+  link['pageContent'] = full_text
+  link['token_count_estimate'] = tokenCount
+  link = add_chunks(link)
 
-  print(f"\n\n[Success]: {len(links)} article or link contents fetched!")
-  print(f"////////////////////////////")
-  print(f"Your estimated cost to embed this data using OpenAI's text-embedding-ada-002 model at $0.0004 / 1K tokens will cost {ada_v2_cost(totalTokens)} using {totalTokens} tokens.")
-  print(f"////////////////////////////")
-  exit(0)
\ No newline at end of file
+  document_path = write_document(link, f"{transaction_output_dir}/{transaction_output_filename}")
+  write_log_copy(link, f"{output_path}/{output_filename}", document_path)
+
+  return tokenCount
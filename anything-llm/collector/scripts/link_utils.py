@@ -1,14 +1,69 @@
 import json
 from datetime import datetime
 from dotenv import load_dotenv
+from unstructured.partition.html import partition_html
 load_dotenv()
 
+# Produces the same text UnstructuredHTMLLoader did, but parses the HTML straight from memory
+# instead of writing it to a tempfile for the loader to read back.
+def html_to_text(html):
+  elements = partition_html(text=html)
+  return "\n\n".join([str(el) for el in elements])
+
+# Walks the parsed document once and collects every metadata field we use, instead of running a
+# CSS selector over the whole page per field. The first occurrence of each field wins.
+def extract_meta(tree):
+  found = {'opengraph': {}, 'jsonld': []}
+  for element in tree.iter('title', 'meta', 'script'):
+    if element.tag == 'title':
+      found.setdefault('title', ' '.join(element.text_content().split()))
+    elif element.tag == 'meta':
+      key = element.get('property') or element.get('name') or ''
+      content = element.get('content')
+      if content is None: continue
+      if key == 'description': found.setdefault('description', content)
+      elif key == 'article:published_time': found.setdefault('published', content)
+      elif key == 'article:modified_time': found.setdefault('modified', content)
+      elif key in ['author', 'article:author']: found.setdefault('author', content)
+      elif key.startswith('og:'): found['opengraph'].setdefault(key[3:], content)
+    elif element.get('type') == 'application/ld+json':
+      try:
+        data = json.loads(element.text_content())
+      except ValueError:
+        continue
+      items = data if isinstance(data, list) else data.get('@graph', [data]) if isinstance(data, dict) else []
+      found['jsonld'].extend(item for item in items if isinstance(item, dict))
+  return found
+
+def _jsonld_field(items, key, join = False):
+  for item in items:
+    value = item.get(key)
+    if isinstance(value, list) and join: value = ', '.join(str(entry) for entry in value)
+    if isinstance(value, list): value = value[0] if len(value) > 0 else None
+    if isinstance(value, dict): value = value.get('name')
+    if value: return value
+  return None
+
 def append_meta(request, text, metadata_only = False):
+  found = extract_meta(request.html.lxml)
+  og = found.get('opengraph')
+  jsonld = found.get('jsonld')
   meta = {
     'url': request.url,
-    'title': request.html.find('title', first=True).text if len(request.html.find('title')) != 0 else '',
-    'description': request.html.find('meta[name="description"]', first=True).attrs.get('content') if  request.html.find('meta[name="description"]', first=True) != None else '',
-    'published':request.html.find('meta[property="article:published_time"]', first=True).attrs.get('content') if request.html.find('meta[property="article:published_time"]', first=True) != None else datetime.today().strftime('%Y-%m-%d %H:%M:%S'),
+    'title': found.get('title') or og.get('title') or _jsonld_field(jsonld, 'headline') or '',
+    'description': found.get('description') or og.get('description') or _jsonld_field(jsonld, 'description') or '',
+    'published': found.get('published') or _jsonld_field(jsonld, 'datePublished') or datetime.today().strftime('%Y-%m-%d %H:%M:%S'),
     'wordCount': len(text.split(' ')),
   }
-  return "Article JSON Metadata:\n"+json.dumps(meta)+"\n\n\nText Content:\n" + text if metadata_only == False else meta
+  extras = {
+    'modified': found.get('modified') or _jsonld_field(jsonld, 'dateModified'),
+    'author': found.get('author') or _jsonld_field(jsonld, 'author'),
+    'siteName': og.get('site_name') or _jsonld_field(jsonld, 'publisher'),
+    'image': og.get('image') or _jsonld_field(jsonld, 'image'),
+    'keywords': _jsonld_field(jsonld, 'keywords', join=True),
+  }
+  meta.update({key: value for key, value in extras.items() if value})
+  return meta_text(meta, text) if metadata_only == False else meta
+
+def meta_text(meta, text):
+  return "Article JSON Metadata:\n"+json.dumps(meta)+"\n\n\nText Content:\n" + text
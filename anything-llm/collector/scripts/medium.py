@@ -1,71 +1,70 @@
-import os, json
+import os
 from urllib.parse import urlparse
-from .utils import tokenize, ada_v2_cost
+from .utils import count_tokens_batch, ada_v2_cost
 from .medium_utils import get_username, fetch_recent_publications, append_meta
+from .http_client import http_summary
+from .output import write_document, document_exists
 from alive_progress import alive_it
 
 # Example medium URL: https://medium.com/@yujiangtham or https://davidall.medium.com
 def medium():
-  print("[NOTICE]: This method will only get the 10 most recent publishings.")
+  print("[NOTICE]: Medium feeds only list the 10 most recent publishings. Rerun this later to add newer ones to those already collected.")
   author_url = input("Enter the medium URL of the author you want to collect: ")
+  result = collect_medium(author_url)
+  if result is None or result.get('nothing_to_collect'): exit(1)
+
+  print(http_summary())
+  print(f"[Success]: {result.get('documents')} scraped and fetched!")
+  print(f"\n\n////////////////////////////")
+  print(f"Your estimated cost to embed all of this data using OpenAI's text-embedding-ada-002 model at $0.0004 / 1K tokens will cost {ada_v2_cost(result.get('tokens'))} using {result.get('tokens')} tokens.")
+  print(f"////////////////////////////\n\n")
+  exit(0)
+
+# Non-interactive collection of an author - returns the documents written and their tokens, or None if the
+# author could not be collected. An author without free publications gives an empty result marked nothing_to_collect.
+def collect_medium(author_url):
   if(author_url == ''):
     print("Not a valid medium.com/@author URL")
-    exit(1)
+    return None
   
   handle = get_username(author_url)
   if(handle is None):
     print("This does not appear to be a valid medium.com/@author URL")
-    exit(1)
+    return None
   
   publications = fetch_recent_publications(handle)
   if(len(publications)==0):
     print("There are no public or free publications by this creator - nothing to collect.")
-    exit(1)
+    return {'documents': 0, 'tokens': 0, 'nothing_to_collect': True}
 
   totalTokenCount = 0
   transaction_output_dir = f"../server/documents/medium-{handle}"
   if os.path.isdir(transaction_output_dir) == False:
     os.makedirs(transaction_output_dir)
 
-  for publication in alive_it(publications):
+  items = []
+  for publication in publications:
     pub_file_path = transaction_output_dir + f"/publication-{publication.get('id')}.json"
-    if os.path.exists(pub_file_path) == True: continue
+    if document_exists(pub_file_path) == True: continue
 
     full_text = publication.get('pageContent')
     if full_text is None or len(full_text) == 0: continue
 
     full_text = append_meta(publication, full_text)
-    item = {
+    items.append({
       'id': publication.get('id'),
       'url': publication.get('url'),
       'title': publication.get('title'),
       'published': publication.get('published'),
       'wordCount': len(full_text.split(' ')),
       'pageContent': full_text,
-    }
+    })
 
-    tokenCount = len(tokenize(full_text))
+  token_counts = count_tokens_batch([item.get('pageContent') for item in items])
+  for item, tokenCount in alive_it(zip(items, token_counts), total=len(items)):
     item['token_count_estimate'] = tokenCount
 
     totalTokenCount += tokenCount
-    with open(pub_file_path, 'w', encoding='utf-8') as file:
-      json.dump(item, file, ensure_ascii=True, indent=4)
-
-  print(f"[Success]: {len(publications)} scraped and fetched!")
-  print(f"\n\n////////////////////////////")
-  print(f"Your estimated cost to embed all of this data using OpenAI's text-embedding-ada-002 model at $0.0004 / 1K tokens will cost {ada_v2_cost(totalTokenCount)} using {totalTokenCount} tokens.")
-  print(f"////////////////////////////\n\n")
-  exit(0)
-
-
-
-
-  
-   
-
-
-
-
-
+    write_document(item, transaction_output_dir + f"/publication-{item.get('id')}.json")
 
-  
\ No newline at end of file
+  return {'documents': len(items), 'tokens': totalTokenCount}
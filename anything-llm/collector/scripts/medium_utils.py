@@ -1,5 +1,6 @@
-import os, json, requests, re
+import os, json, re
 from bs4 import BeautifulSoup
+from .http_client import conditional_get, remember_validators
 
 def get_username(author_url):
   if '@' in author_url:
@@ -19,27 +20,43 @@ def get_docid(medium_docpath):
 
 def fetch_recent_publications(handle):
   rss_link = f"https://medium.com/feed/@{handle}"
-  response = requests.get(rss_link)
-  if(response.ok == False):
-    print(f"Could not fetch RSS results for author.")
-    return []
-  
-  xml = response.content
-  soup = BeautifulSoup(xml, 'xml')
-  items = soup.find_all('item')
-  publications = []
-
   if os.path.isdir("./outputs/medium-logs") == False:
       os.makedirs("./outputs/medium-logs")
 
   file_path = f"./outputs/medium-logs/medium-{handle}.json"
-
+  cached = None
   if os.path.exists(file_path):
     with open(file_path, "r") as file:
-      print(f"Returning cached data for Author {handle}. If you do not wish to use stored data then delete the file for this author to allow refetching.")
-      return json.load(file)
+      cached = json.load(file)
 
-  for item in items:
+  # With a cached copy the feed is only downloaded when it changed since the last fetch.
+  response = conditional_get(rss_link, revalidate=cached is not None)
+  if response.status_code == 304:
+    print(f"Feed for Author {handle} has not changed - returning {len(cached)} cached articles. Delete medium-logs/medium-{handle}.json to refetch everything.")
+    return cached
+
+  if(response.ok == False):
+    print(f"Could not fetch RSS results for author.")
+    return cached or []
+
+  publications = parse_feed(response.content)
+  if cached is not None:
+    known = set(publication.get('id') for publication in publications)
+    merged = publications + [publication for publication in cached if publication.get('id') not in known]
+    print(f"{len(merged) - len(cached)} new articles found for author medium.com/@{handle}.")
+    publications = merged
+
+  with open(file_path, 'w+', encoding='utf-8') as json_file:
+    json.dump(publications, json_file, ensure_ascii=True, indent=2)
+    print(f"{len(publications)} articles found for author medium.com/@{handle}. Saved to medium-logs/medium-{handle}.json")
+  remember_validators(rss_link, response)
+
+  return publications
+
+def parse_feed(xml):
+  soup = BeautifulSoup(xml, 'xml')
+  publications = []
+  for item in soup.find_all('item'):
     tags = []
     for tag in item.find_all('category'): tags.append(tag.text)
     content = BeautifulSoup(item.find('content:encoded').text, 'html.parser')
@@ -52,11 +69,6 @@ def fetch_recent_publications(handle):
       'pageContent': content.get_text()
     }
     publications.append(data)
-  
-  with open(file_path, 'w+', encoding='utf-8') as json_file:
-    json.dump(publications, json_file, ensure_ascii=True, indent=2)
-    print(f"{len(publications)} articles found for author medium.com/@{handle}. Saved to medium-logs/medium-{handle}.json")
-
   return publications
 
 def append_meta(publication, text):
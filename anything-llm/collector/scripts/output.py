@@ -0,0 +1,118 @@
+import os, json, gzip, shutil, tempfile
+from . import sink
+from .utils import chunk_text
+
+# zstandard is optional - without it zstd compression falls back to gzip.
+try:
+  import zstandard
+except ImportError:
+  zstandard = None
+
+# Every collected document goes through here so all collectors share one on-disk format:
+#   OUTPUT_FORMAT          - legacy (indented, ASCII-escaped JSON - default) or compact (UTF-8 JSON without whitespace)
+#   OUTPUT_LOG_COPY        - what to do with the copy kept in outputs/*-logs: copy (default), hardlink or skip
+#   OUTPUT_LOG_COMPRESSION - none (default), gzip or zstd for those log copies. The server only reads plain
+#                            .json, so documents in server/documents are never compressed.
+#   DOCUMENT_SINK          - where documents go, comma separated: files (one JSON file per document - default),
+#                            jsonl and/or parquet (rolling segments in outputs/document-store, see sink.py).
+#                            The server only reads files, so keep `files` unless the segments are consumed elsewhere.
+#   CHUNK_SIZE             - when set, documents also get a `chunks` list of token-bounded chunks of pageContent
+#                            (character offsets and token counts) so the server need not re-split them (default 0 - off)
+#   CHUNK_OVERLAP          - tokens shared by consecutive chunks (default 0)
+OUTPUT_FORMAT = os.getenv('OUTPUT_FORMAT', 'legacy')
+CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', 0))
+CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', 0))
+DOCUMENT_SINKS = [name.strip() for name in os.getenv('DOCUMENT_SINK', 'files').split(',') if name.strip() != '']
+OUTPUT_LOG_COPY = os.getenv('OUTPUT_LOG_COPY', 'copy')
+OUTPUT_LOG_COMPRESSION = os.getenv('OUTPUT_LOG_COMPRESSION', 'none')
+if OUTPUT_LOG_COMPRESSION == 'zstd' and zstandard is None:
+  print("OUTPUT_LOG_COMPRESSION=zstd needs the zstandard package - falling back to gzip.")
+  OUTPUT_LOG_COMPRESSION = 'gzip'
+if 'parquet' in DOCUMENT_SINKS and sink.pyarrow is None:
+  print("DOCUMENT_SINK=parquet needs the pyarrow package - falling back to jsonl.")
+  DOCUMENT_SINKS = [name for name in DOCUMENT_SINKS if name != 'parquet'] + ['jsonl']
+
+# mkstemp creates owner-only files, so written documents get the mode a plain open() would have given them.
+UMASK = os.umask(0)
+os.umask(UMASK)
+FILE_MODE = 0o666 & ~UMASK
+
+def dumps(data):
+  if OUTPUT_FORMAT == 'compact':
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+  return json.dumps(data, ensure_ascii=True, indent=4).encode('utf-8')
+
+def compress(payload, compression):
+  if compression == 'gzip': return gzip.compress(payload), '.gz'
+  if compression == 'zstd': return zstandard.ZstdCompressor().compress(payload), '.zst'
+  return payload, ''
+
+# The payload is written to a temp file in the same directory and renamed over the destination, so readers
+# never see a half-written document. Temp files do not end in .json and are ignored by the server.
+def atomic_write(path, payload):
+  directory = os.path.dirname(path) or '.'
+  os.makedirs(directory, exist_ok=True)
+  fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+  try:
+    with os.fdopen(fd, 'wb') as file:
+      file.write(payload)
+    os.chmod(temp_path, FILE_MODE)
+    os.replace(temp_path, path)
+  except BaseException:
+    if os.path.exists(temp_path): os.remove(temp_path)
+    raise
+
+# The chunking pass tokenizes the whole text, so it also replaces the token estimate with the exact count.
+# Documents that already have chunks are returned as they are, so callers writing a document and its log
+# copy can chunk it once up front.
+def add_chunks(data):
+  if CHUNK_SIZE <= 0 or len(data.get('pageContent') or '') == 0 or 'chunks' in data: return data
+  chunks, tokenCount = chunk_text(data.get('pageContent'), CHUNK_SIZE, CHUNK_OVERLAP)
+  return {**data, 'token_count_estimate': tokenCount, 'chunks': chunks}
+
+# Returns the path of the written JSON file, or None when documents only go to segments.
+def write_document(data, path):
+  data = add_chunks(data)
+  for name in ['jsonl', 'parquet']:
+    if name in DOCUMENT_SINKS: sink.append_document(data, path, name)
+  if 'files' not in DOCUMENT_SINKS: return None
+
+  atomic_write(path, dumps(data))
+  return path
+
+def document_exists(path):
+  if 'files' in DOCUMENT_SINKS: return os.path.exists(path)
+  collection = os.path.basename(os.path.dirname(path))
+  return sink.has_documents(collection, [os.path.splitext(os.path.basename(path))[0]])
+
+# Keeps the outputs/*-logs copy of a document that was already written to `document_path`.
+# Returns the log path, or None when log copies are skipped.
+def write_log_copy(data, path, document_path=None):
+  if OUTPUT_LOG_COPY == 'skip': return None
+
+  if OUTPUT_LOG_COPY == 'hardlink' and OUTPUT_LOG_COMPRESSION == 'none' and document_path is not None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    link_path = f"{path}.link.tmp"
+    try:
+      if os.path.exists(link_path): os.remove(link_path)
+      os.link(document_path, link_path)
+      os.replace(link_path, path)
+      return path
+    except OSError:
+      # Hardlinks cannot cross filesystems - copy instead.
+      shutil.copyfile(document_path, link_path)
+      os.replace(link_path, path)
+      return path
+
+  payload, suffix = compress(dumps(data), OUTPUT_LOG_COMPRESSION)
+  atomic_write(f"{path}{suffix}", payload)
+  return f"{path}{suffix}"
+
+def load_document(path):
+  with open(path, 'rb') as file:
+    payload = file.read()
+  if path.endswith('.gz'): payload = gzip.decompress(payload)
+  if path.endswith('.zst'):
+    if zstandard is None: raise RuntimeError(f"{path} is zstd compressed - install zstandard to read it.")
+    payload = zstandard.ZstdDecompressor().decompress(payload)
+  return json.loads(payload)
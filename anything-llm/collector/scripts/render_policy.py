@@ -0,0 +1,102 @@
+import os, json, time, threading
+from urllib.parse import urlparse
+from .link_utils import html_to_text
+
+# RENDER_POLICY controls when pages are rendered in headless Chromium before extraction:
+#   never  - always use the static HTML
+#   always - always render (the old behaviour)
+#   auto   - extract from the static HTML first and only render when it yields too little text.
+#            Domains where rendering clearly helped are remembered so their static pass is skipped next time.
+#            Such a decision is re-checked with a static pass once it is RENDER_RECHECK_HOURS old (default 24).
+DECISIONS_PATH = "./outputs/render-decisions.json"
+# Rendering counts as having helped when it yields enough text where the static HTML did not, or at least
+# this many times as much text.
+RENDER_MIN_GAIN = 2
+stats = {'rendered': 0, 'avoided': 0}
+_decisions = None
+_lock = threading.Lock()
+
+def render_policy():
+  policy = os.getenv('RENDER_POLICY', 'auto')
+  return policy if policy in ['never', 'always', 'auto'] else 'auto'
+
+def min_text_length():
+  return int(os.getenv('RENDER_MIN_TEXT_LENGTH', 500))
+
+def recheck_after():
+  return float(os.getenv('RENDER_RECHECK_HOURS', 24)) * 60 * 60
+
+# Decisions are stored as {domain: {'decision': 'render' | 'static', 'checked': unix time}}. Files written
+# before decisions were re-checked hold bare strings - those count as due for a re-check.
+def _load_decisions():
+  global _decisions
+  if _decisions is None:
+    _decisions = {}
+    if os.path.exists(DECISIONS_PATH):
+      with open(DECISIONS_PATH, 'r') as file:
+        _decisions = json.load(file)
+    for domain, decision in _decisions.items():
+      if isinstance(decision, str): _decisions[domain] = {'decision': decision, 'checked': 0}
+  return _decisions
+
+def remember_decision(domain, decision):
+  with _lock:
+    decisions = _load_decisions()
+    # Static decisions are never re-checked, so only a change (or a confirmed render) is worth a write.
+    if decisions.get(domain, {}).get('decision') == decision and decision == 'static': return
+    decisions[domain] = {'decision': decision, 'checked': time.time()}
+    if os.path.isdir(os.path.dirname(DECISIONS_PATH)) == False: os.makedirs(os.path.dirname(DECISIONS_PATH))
+    with open(DECISIONS_PATH, 'w', encoding='utf-8') as file:
+      json.dump(decisions, file, indent=2)
+
+# True when the page has to be rendered before any extraction - always, or for domains that needed it recently.
+def render_first(url):
+  policy = render_policy()
+  if policy == 'always': return True
+  if policy == 'auto':
+    with _lock:
+      decision = _load_decisions().get(urlparse(url).netloc)
+    return decision is not None and decision['decision'] == 'render' and time.time() - decision['checked'] < recheck_after()
+  return False
+
+# True when text extracted from the static HTML is good enough to skip rendering.
+def static_suffices(url, text):
+  policy = render_policy()
+  if policy == 'never' or len(text) >= min_text_length():
+    with _lock:
+      stats['avoided'] += 1
+    if policy == 'auto': remember_decision(urlparse(url).netloc, 'static')
+    return True
+  return False
+
+def rendering_helped(text, static):
+  if len(text) >= min_text_length(): return True
+  return len(text) >= len(static) * RENDER_MIN_GAIN and len(text) > len(static)
+
+def record_render(url, text, static = None):
+  with _lock:
+    stats['rendered'] += 1
+  if render_policy() == 'auto' and static is not None:
+    remember_decision(urlparse(url).netloc, 'render' if rendering_helped(text, static) else 'static')
+
+# Returns (text, needs_render). When needs_render is True the page must be rendered and passed
+# to rendered_text() - text is then the static text (if any) used to judge whether rendering helped.
+def static_text(req):
+  if render_first(req.url): return None, True
+  text = html_to_text(req.html.html)
+  return text, static_suffices(req.url, text) == False
+
+def rendered_text(req, static = None):
+  text = html_to_text(req.html.html)
+  record_render(req.url, text, static)
+  return text
+
+def page_text(req):
+  text, needs_render = static_text(req)
+  if needs_render == False: return text
+  req.html.render()
+  return rendered_text(req, text)
+
+def render_summary():
+  total = stats['rendered'] + stats['avoided']
+  return f"[RENDER]: {stats['avoided']} of {total} pages used static HTML - {stats['avoided']} headless renders avoided (policy: {render_policy()})."
@@ -0,0 +1,220 @@
+import os, sys, json, time, sqlite3, threading
+from multiprocessing import util
+
+# fcntl is POSIX-only - elsewhere appends are only serialised within this process.
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+
+# pyarrow is optional - without it the parquet sink falls back to JSONL.
+try:
+  import pyarrow
+  import pyarrow.parquet as parquet
+except ImportError:
+  pyarrow = None
+
+# Instead of (or as well as) one JSON file per document, documents can be appended to rolling segments
+# under outputs/document-store/{collection}/, where the collection is the server/documents folder the
+# document would have been written to. An SQLite index maps every document id to its segment and offset
+# so a single document can be read back without scanning. Documents without an id (e.g. links) are indexed
+# as {collection}/{file name without .json}:
+#   jsonl   - one document per line. Segments roll over at DOCUMENT_SEGMENT_SIZE MB (default 64) and are
+#             shared by every process, appends are serialised with a file lock.
+#   parquet - documents are buffered and written DOCUMENT_SEGMENT_ROWS (default 1000) at a time, or once the
+#             oldest buffered document is DOCUMENT_FLUSH_SECONDS (default 300) old, and when the process
+#             exits. Each process writes its own segment files. Needs pyarrow.
+# Each process keeps one index connection and commits its index entries in batches - when a segment is
+# finished, after every source file (see commit), DOCUMENT_FLUSH_SECONDS after the oldest uncommitted entry
+# and when the process exits.
+STORE_PATH = "./outputs/document-store"
+INDEX_PATH = f"{STORE_PATH}/index.db"
+SEGMENT_SIZE = int(float(os.getenv('DOCUMENT_SEGMENT_SIZE', 64)) * 1024 * 1024)
+SEGMENT_ROWS = int(os.getenv('DOCUMENT_SEGMENT_ROWS', 1000))
+FLUSH_SECONDS = float(os.getenv('DOCUMENT_FLUSH_SECONDS', 300))
+_lock = threading.RLock()
+_buffers = {}
+_buffered_since = {}
+_segments = {}
+_pending = []
+_pending_since = None
+_connection = None
+_flush_registered = None
+
+# A forked worker must not share its parent's SQLite connection, so connections are kept per process.
+def _connect():
+  global _connection
+  if _connection is not None and _connection[0] == os.getpid(): return _connection[1]
+  if os.path.isdir(STORE_PATH) == False: os.makedirs(STORE_PATH, exist_ok=True)
+  conn = sqlite3.connect(INDEX_PATH, timeout=30, check_same_thread=False)
+  conn.execute("PRAGMA journal_mode=WAL")
+  conn.execute("CREATE TABLE IF NOT EXISTS documents (id TEXT PRIMARY KEY, name TEXT, collection TEXT, segment TEXT, offset INTEGER, length INTEGER)")
+  conn.execute("CREATE INDEX IF NOT EXISTS documents_name ON documents (collection, name)")
+  conn.commit()
+  _connection = (os.getpid(), conn)
+  return conn
+
+# Entries are kept in memory rather than in an open transaction, which would hold the index's write lock
+# and stall every other process until it commits.
+def _index(entries, now=False):
+  global _pending_since
+  with _lock:
+    _register_flush()
+    _pending.extend(entries)
+    if _pending_since is None: _pending_since = time.monotonic()
+    if now or time.monotonic() - _pending_since >= FLUSH_SECONDS: commit()
+
+# Commits the index entries of the documents appended so far.
+def commit():
+  global _pending_since
+  with _lock:
+    if len(_pending) == 0: return
+    conn = _connect()
+    with conn:
+      conn.executemany("INSERT OR REPLACE INTO documents (id, name, collection, segment, offset, length) VALUES (?, ?, ?, ?, ?, ?)", _pending)
+    _pending.clear()
+    _pending_since = None
+
+def _locate(path):
+  collection = os.path.basename(os.path.dirname(path))
+  name = os.path.splitext(os.path.basename(path))[0]
+  return collection, name
+
+def document_key(data, collection, name):
+  return str(data.get('id')) if data.get('id') is not None else f"{collection}/{name}"
+
+def append_document(data, path, sink='jsonl'):
+  if sink == 'parquet' and pyarrow is not None:
+    return _buffer_parquet(data, path)
+  return _append_jsonl(data, path)
+
+def _append_jsonl(data, path):
+  collection, name = _locate(path)
+  directory = f"{STORE_PATH}/{collection}"
+  os.makedirs(directory, exist_ok=True)
+  line = (json.dumps(data, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+
+  with _lock, open(f"{directory}/.lock", 'w') as lock_file:
+    if fcntl is not None: fcntl.flock(lock_file, fcntl.LOCK_EX)
+    # The segment is only looked up once per collection. Other processes may have rolled over since, so a
+    # full segment just moves this one on to the next segment that has room.
+    previous = _segments.get(collection)
+    segment = previous or _last_segment(directory)
+    while os.path.exists(f"{directory}/{segment}") and os.path.getsize(f"{directory}/{segment}") + len(line) > SEGMENT_SIZE:
+      segment = f"segment-{int(segment[len('segment-'):-len('.jsonl')]) + 1:05d}.jsonl"
+    _segments[collection] = segment
+
+    with open(f"{directory}/{segment}", 'ab') as file:
+      offset = file.seek(0, os.SEEK_END)
+      file.write(line)
+    _index([(document_key(data, collection, name), name, collection, segment, offset, len(line))], now=previous not in (None, segment))
+  return f"{directory}/{segment}"
+
+def _last_segment(directory):
+  segments = sorted(filename for filename in os.listdir(directory) if filename.endswith('.jsonl'))
+  return segments[-1] if len(segments) > 0 else 'segment-00000.jsonl'
+
+def _buffer_parquet(data, path):
+  collection, name = _locate(path)
+  with _lock:
+    _register_flush()
+    buffer = _buffers.setdefault(collection, [])
+    buffer.append((name, data))
+    since = _buffered_since.setdefault(collection, time.monotonic())
+    if len(buffer) < SEGMENT_ROWS and time.monotonic() - since < FLUSH_SECONDS: return None
+    _buffers[collection] = []
+    _buffered_since.pop(collection, None)
+  return _write_parquet(collection, buffer)
+
+# Whatever is still buffered or uncommitted is written when the process exits. multiprocessing's finalizers
+# also run when a pool worker exits cleanly (atexit handlers do not), but a forked worker starts with an empty
+# registry - so every process registers on its first buffered document or index entry.
+def _register_flush():
+  global _flush_registered
+  if _flush_registered == os.getpid(): return
+  util.Finalize(None, flush, exitpriority=10)
+  _flush_registered = os.getpid()
+
+def _write_parquet(collection, buffer):
+  directory = f"{STORE_PATH}/{collection}"
+  os.makedirs(directory, exist_ok=True)
+  segment = f"segment-{time.time_ns()}-{os.getpid()}.parquet"
+  # Documents from different collectors have different fields - each row stores its document as JSON
+  # next to the id so every segment has the same schema.
+  table = pyarrow.table({
+    'id': [document_key(data, collection, name) for name, data in buffer],
+    'document': [json.dumps(data, ensure_ascii=False, separators=(',', ':')) for _, data in buffer],
+  })
+  parquet.write_table(table, f"{directory}/{segment}.tmp", compression='zstd')
+  os.replace(f"{directory}/{segment}.tmp", f"{directory}/{segment}")
+  _index([(document_key(data, collection, name), name, collection, segment, row, None) for row, (name, data) in enumerate(buffer)], now=True)
+  return f"{directory}/{segment}"
+
+def flush():
+  with _lock:
+    pending = [(collection, buffer) for collection, buffer in _buffers.items() if len(buffer) > 0]
+    _buffers.clear()
+    _buffered_since.clear()
+  for collection, buffer in pending:
+    _write_parquet(collection, buffer)
+  commit()
+
+def has_documents(collection, names):
+  if len(names) == 0: return False
+  # Entries this process has not committed yet are looked up in memory rather than committed early.
+  with _lock:
+    missing = set(names) - {entry[1] for entry in _pending if entry[2] == collection}
+    if len(missing) == 0: return True
+    if os.path.exists(INDEX_PATH) == False: return False
+    found = _connect().execute(
+      f"SELECT COUNT(DISTINCT name) FROM documents WHERE collection = ? AND name IN ({','.join('?' * len(missing))})",
+      (collection, *missing)
+    ).fetchone()[0]
+  return found == len(missing)
+
+# Reads a single document back from its segment by seeking to its offset (for parquet, reading only the row
+# group that holds its row). Returns None if the id is unknown.
+def read_document(document_id):
+  with _lock:
+    row = next((entry[2:] for entry in reversed(_pending) if entry[0] == document_id), None)
+    if row is None:
+      if os.path.exists(INDEX_PATH) == False: return None
+      row = _connect().execute("SELECT collection, segment, offset, length FROM documents WHERE id = ?", (document_id,)).fetchone()
+  if row is None: return None
+
+  collection, segment, offset, length = row
+  segment_path = f"{STORE_PATH}/{collection}/{segment}"
+  if segment.endswith('.parquet'):
+    if pyarrow is None: raise RuntimeError(f"{segment_path} is a parquet segment - install pyarrow to read it.")
+    segment_file = parquet.ParquetFile(segment_path)
+    for group in range(segment_file.num_row_groups):
+      rows = segment_file.metadata.row_group(group).num_rows
+      if offset < rows:
+        return json.loads(segment_file.read_row_group(group, columns=['document']).column('document')[offset].as_py())
+      offset -= rows
+    return None
+
+  with open(segment_path, 'rb') as file:
+    file.seek(offset)
+    return json.loads(file.read(length))
+
+def iter_documents(collection):
+  directory = f"{STORE_PATH}/{collection}"
+  for segment in sorted(os.listdir(directory)):
+    if segment.endswith('.jsonl'):
+      with open(f"{directory}/{segment}", 'rb') as file:
+        for line in file: yield json.loads(line)
+    if segment.endswith('.parquet'):
+      for document in parquet.read_table(f"{directory}/{segment}", columns=['document']).column('document'):
+        yield json.loads(document.as_py())
+
+# python -m scripts.sink <document id | collection/name>
+if __name__ == "__main__":
+  if len(sys.argv) != 2:
+    print("Usage: python -m scripts.sink <document id | collection/name>")
+    exit(1)
+  document = read_document(sys.argv[1])
+  if document is None:
+    print(f"No document with id {sys.argv[1]} in {INDEX_PATH}.")
+    exit(1)
+  print(json.dumps(document, ensure_ascii=False, indent=4))
@@ -1,20 +1,40 @@
-import os, json
+import os, asyncio
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urlparse
-from .utils import tokenize, ada_v2_cost
-from .substack_utils import fetch_all_publications, only_valid_publications, get_content, append_meta
-from alive_progress import alive_it
+from .utils import count_tokens, ada_v2_cost
+from .substack_utils import fetch_all_publications, only_valid_publications, append_meta
+from .link_utils import html_to_text
+from .link import release_render
+from .render_policy import render_first, static_suffices, record_render, render_summary
+from .http_client import get_async_session, http_summary
+from .output import write_document, document_exists
+from alive_progress import alive_bar
 
 # Example substack URL: https://swyx.substack.com/
 def substack():
   author_url = input("Enter the substack URL of the author you want to collect: ")
+  result = collect_substack(author_url)
+  if result is None or result.get('nothing_to_collect'): exit(1)
+
+  print(render_summary())
+  print(http_summary())
+  print(f"[Success]: {result.get('documents')} scraped and fetched!")
+  print(f"\n\n////////////////////////////")
+  print(f"Your estimated cost to embed all of this data using OpenAI's text-embedding-ada-002 model at $0.0004 / 1K tokens will cost {ada_v2_cost(result.get('tokens'))} using {result.get('tokens')} tokens.")
+  print(f"////////////////////////////\n\n")
+  exit(0)
+
+# Non-interactive collection of a newsletter - returns the documents written and their tokens, or None if the
+# newsletter could not be collected. A newsletter without readable posts gives an empty result marked nothing_to_collect.
+def collect_substack(author_url):
   if(author_url == ''):
     print("Not a valid author.substack.com URL")
-    exit(1)
+    return None
   
   source = urlparse(author_url)
   if('substack.com' not in source.netloc or len(source.netloc.split('.')) != 3):
     print("This does not appear to be a valid author.substack.com URL")
-    exit(1)
+    return None
   
   subdomain = source.netloc.split('.')[0]
   publications = fetch_all_publications(subdomain)
@@ -22,57 +42,143 @@ def substack():
 
   if(len(valid_publications)==0):
     print("There are no public or free preview newsletters by this creator - nothing to collect.")
-    exit(1)
+    return {'documents': 0, 'tokens': 0, 'nothing_to_collect': True}
 
   print(f"{len(valid_publications)} of {len(publications)} publications are readable publically text posts - collecting those.")
   
-  totalTokenCount = 0
   transaction_output_dir = f"../server/documents/substack-{subdomain}"
   if os.path.isdir(transaction_output_dir) == False:
     os.makedirs(transaction_output_dir)
 
-  for publication in alive_it(valid_publications):
-    pub_file_path = transaction_output_dir + f"/publication-{publication.get('id')}.json"
-    if os.path.exists(pub_file_path) == True: continue
-
-    full_text = get_content(publication.get('canonical_url'))
-    if full_text is None or len(full_text) == 0: continue
-
-    full_text = append_meta(publication, full_text)
-    item = {
-      'id': publication.get('id'),
-      'url': publication.get('canonical_url'),
-      'thumbnail': publication.get('cover_image'),
-      'title': publication.get('title'),
-      'subtitle': publication.get('subtitle'),
-      'description': publication.get('description'),
-      'published': publication.get('post_date'),
-      'wordCount': publication.get('wordcount'),
-      'pageContent': full_text,
-    }
-
-    tokenCount = len(tokenize(full_text))
-    item['token_count_estimate'] = tokenCount
-
-    totalTokenCount += tokenCount
-    with open(pub_file_path, 'w', encoding='utf-8') as file:
-      json.dump(item, file, ensure_ascii=True, indent=4)
-
-  print(f"[Success]: {len(valid_publications)} scraped and fetched!")
-  print(f"\n\n////////////////////////////")
-  print(f"Your estimated cost to embed all of this data using OpenAI's text-embedding-ada-002 model at $0.0004 / 1K tokens will cost {ada_v2_cost(totalTokenCount)} using {totalTokenCount} tokens.")
-  print(f"////////////////////////////\n\n")
-  exit(0)
-
-
-
-
-  
-   
-
-
-
-
-
-
-  
\ No newline at end of file
+  pending = [publication for publication in valid_publications if document_exists(transaction_output_dir + f"/publication-{publication.get('id')}.json") == False]
+  with alive_bar(len(pending)) as bar:
+    documents, totalTokenCount = asyncio.run(collect_publications(
+      pending,
+      transaction_output_dir,
+      concurrency=int(os.getenv('SUBSTACK_CONCURRENCY', 4)),
+      extract_workers=int(os.getenv('SUBSTACK_EXTRACT_WORKERS', 0)) or None,
+      progress=bar,
+    ))
+  return {'documents': documents, 'tokens': totalTokenCount}
+
+# Posts flow through three stages joined by bounded queues so network waits, parsing and writing overlap:
+#   fetch   - `concurrency` coroutines download (and if needed render) posts
+#   extract - HTML is parsed into text on a process pool of `extract_workers`
+#   write   - tokenizing and writing happen one post at a time off the event loop
+async def collect_publications(publications, transaction_output_dir, concurrency=4, extract_workers=None, progress=None, timeout=60):
+  session = get_async_session(workers=concurrency)
+  browser_lock = asyncio.Lock()
+  extract_queue = asyncio.Queue(maxsize=concurrency * 2)
+  write_queue = asyncio.Queue(maxsize=concurrency * 2)
+  loop = asyncio.get_running_loop()
+  remaining = iter(publications)
+
+  def skip(publication, reason):
+    print(f"{reason} {publication.get('canonical_url')} - skipping!")
+    if progress is not None: progress()
+
+  async def render(req):
+    async with browser_lock:
+      await session.browser
+    # Timing out or cancelling arender part-way would leave its tab open in the shared browser, so the render is
+    # shielded and keeps its page, which is closed as soon as the render is over either way (as in link.py).
+    render = asyncio.ensure_future(req.html.arender(keep_page=True))
+    render.add_done_callback(lambda _: release_render(render, req.html))
+    await asyncio.wait_for(asyncio.shield(render), timeout)
+
+  async def fetcher():
+    for publication in remaining:
+      try:
+        req = await asyncio.wait_for(session.get(publication.get('canonical_url')), timeout)
+        if(req.ok == False):
+          skip(publication, "Could not reach")
+          continue
+        rendered = render_first(req.url)
+        if rendered: await render(req)
+      except Exception as e:
+        skip(publication, f"Could not fetch ({e})")
+        continue
+      await extract_queue.put((publication, req, rendered))
+
+  async def extractor(pool):
+    while (item := await extract_queue.get()) is not None:
+      publication, req, rendered = item
+      try:
+        full_text = await loop.run_in_executor(pool, html_to_text, req.html.html)
+        if rendered:
+          record_render(req.url, full_text)
+        elif static_suffices(req.url, full_text) == False:
+          await render(req)
+          static = full_text
+          full_text = await loop.run_in_executor(pool, html_to_text, req.html.html)
+          record_render(req.url, full_text, static)
+      except Exception as e:
+        skip(publication, f"Could not extract ({e})")
+        continue
+      await write_queue.put((publication, full_text))
+
+  # Errors are handled per post, as a failed write must not stop the posts queued behind it.
+  async def writer():
+    documents, totalTokenCount = 0, 0
+    while (item := await write_queue.get()) is not None:
+      try:
+        tokenCount = await loop.run_in_executor(None, write_publication, *item, transaction_output_dir)
+      except Exception as e:
+        print(f"Could not write {item[0].get('canonical_url')} ({e}) - skipping!")
+        tokenCount = None
+      if tokenCount is not None:
+        documents += 1
+        totalTokenCount += tokenCount
+      if progress is not None: progress()
+    return documents, totalTokenCount
+
+  extract_workers = extract_workers or os.cpu_count() or 1
+  with ProcessPoolExecutor(max_workers=extract_workers) as pool:
+    write_task = asyncio.create_task(writer())
+    extract_tasks = [asyncio.create_task(extractor(pool)) for _ in range(extract_workers)]
+    fetch_tasks = [asyncio.create_task(fetcher()) for _ in range(concurrency)]
+    tasks = [write_task, *extract_tasks, *fetch_tasks]
+
+    async def produce():
+      await asyncio.gather(*fetch_tasks)
+      for _ in extract_tasks: await extract_queue.put(None)
+      await asyncio.gather(*extract_tasks)
+      await write_queue.put(None)
+
+    try:
+      _, result = await asyncio.gather(produce(), write_task)
+      return result
+    except BaseException:
+      # A stage that dies stops draining its queue and would leave the others blocked forever.
+      await cancel_all(tasks)
+      raise
+    finally:
+      await session.close()
+
+# asyncio.wait_for before Python 3.12 can swallow a cancellation that races with its result, so cancellation is
+# repeated until every task has actually stopped.
+async def cancel_all(tasks):
+  while pending := [task for task in tasks if not task.done()]:
+    for task in pending: task.cancel()
+    await asyncio.wait(pending, timeout=1)
+
+def write_publication(publication, full_text, transaction_output_dir):
+  if full_text is None or len(full_text) == 0: return None
+
+  full_text = append_meta(publication, full_text)
+  item = {
+    'id': publication.get('id'),
+    'url': publication.get('canonical_url'),
+    'thumbnail': publication.get('cover_image'),
+    'title': publication.get('title'),
+    'subtitle': publication.get('subtitle'),
+    'description': publication.get('description'),
+    'published': publication.get('post_date'),
+    'wordCount': publication.get('wordcount'),
+    'pageContent': full_text,
+  }
+
+  tokenCount = count_tokens(full_text)
+  item['token_count_estimate'] = tokenCount
+  write_document(item, transaction_output_dir + f"/publication-{publication.get('id')}.json")
+  return tokenCount
@@ -1,6 +1,6 @@
-import os, json, requests, tempfile
-from requests_html import HTMLSession
-from langchain.document_loaders import UnstructuredHTMLLoader
+import os, json
+from concurrent.futures import ThreadPoolExecutor
+from .http_client import get_session
 
 def fetch_all_publications(subdomain):
   file_path = f"./outputs/substack-logs/substack-{subdomain}.json"
@@ -10,35 +10,81 @@ def fetch_all_publications(subdomain):
   
   if os.path.exists(file_path):
     with open(file_path, "r") as file:
-      print(f"Returning cached data for substack {subdomain}.substack.com. If you do not wish to use stored data then delete the file for this newsletter to allow refetching.")
-      return json.load(file)
+      cached = json.load(file)
+    new_publications = fetch_new_publications(subdomain, cached)
+    print(f"Synced cached data for substack {subdomain}.substack.com - {len(new_publications)} new publications since the last sync.")
+    if len(new_publications) == 0: return cached
+    publications = new_publications + cached
+  else:
+    publications = crawl_archive(subdomain, int(os.getenv('SUBSTACK_ARCHIVE_CONCURRENCY', 4)))
 
-  collecting = True
+  with open(file_path, 'w+', encoding='utf-8') as json_file:
+    json.dump(publications, json_file, ensure_ascii=True, indent=2)
+    print(f"{len(publications)} publications found for author {subdomain}.substack.com. Saved to substack-logs/substack-{subdomain}.json")
+  
+  return publications
+
+def fetch_archive_page(subdomain, offset):
+  url = f"https://{subdomain}.substack.com/api/v1/archive?sort=new&offset={offset}"
+  response = get_session().get(url)
+  if(response.ok == False):
+    print("Bad response - exiting collection")
+    return None
+  return response.json()
+
+# The archive is sorted newest first, so only pages until the newest cached post are needed.
+def fetch_new_publications(subdomain, cached):
+  known_ids = set(publication.get('id') for publication in cached)
+  newest = max([publication.get('post_date') or '' for publication in cached], default='')
+  new_publications = []
   offset = 0
-  publications = []
 
-  while collecting is True:
-    url = f"https://{subdomain}.substack.com/api/v1/archive?sort=new&offset={offset}"
-    response = requests.get(url)
-    if(response.ok == False):
-      print("Bad response - exiting collection")
-      collecting = False
-      continue
-    
-    data = response.json()
+  while True:
+    data = fetch_archive_page(subdomain, offset)
+    if data is None or len(data) == 0: break
+
+    for publication in data:
+      if publication.get('id') in known_ids or (publication.get('post_date') or '') <= newest:
+        return new_publications
+      new_publications.append(publication)
+    offset += len(data)
+  return new_publications
+
+# Full crawl - after the first page tells us the page size, `concurrency` offsets are fetched at once
+# until a page comes back empty.
+def crawl_archive(subdomain, concurrency = 4):
+  first_page = fetch_archive_page(subdomain, 0)
+  if first_page is None or len(first_page) == 0: return []
 
-    if(len(data) ==0 ):
-      collecting = False
-      continue
+  page_size = len(first_page)
+  publications = list(first_page)
+  seen_ids = set(publication.get('id') for publication in first_page)
+  offset = page_size
+  collecting = True
 
+  def add(data):
     for publication in data:
+      if publication.get('id') in seen_ids: continue
+      seen_ids.add(publication.get('id'))
       publications.append(publication)
-    offset = len(publications)
-  
-  with open(file_path, 'w+', encoding='utf-8') as json_file:
-    json.dump(publications, json_file, ensure_ascii=True, indent=2)
-    print(f"{len(publications)} publications found for author {subdomain}.substack.com. Saved to substack-logs/channel-{subdomain}.json")
-  
+
+  with ThreadPoolExecutor(max_workers=concurrency) as executor:
+    while collecting is True:
+      offsets = [offset + page * page_size for page in range(concurrency)]
+      for page_offset, data in zip(offsets, executor.map(lambda page_offset: fetch_archive_page(subdomain, page_offset), offsets)):
+        if data is None or len(data) == 0:
+          collecting = False
+          break
+        add(data)
+
+        # A short page does not mean the archive ended - fetch what lies between it and the next page's offset.
+        gap_offset = page_offset + len(data)
+        while gap_offset < page_offset + page_size:
+          data = fetch_archive_page(subdomain, gap_offset)
+          if data is None or len(data) == 0: break
+          add(data)
+          gap_offset += len(data)
+      offset += concurrency * page_size
   return publications
 
 def only_valid_publications(publications= []):
@@ -49,30 +95,6 @@ def only_valid_publications(publications= []):
     valid_publications.append(publication)
   return valid_publications
 
-def get_content(article_link):
-  print(f"Fetching {article_link}")
-  if(len(article_link) == 0):
-    print("Invalid URL!")
-    return None
-
-  session = HTMLSession()
-  req = session.get(article_link)
-  if(req.ok == False):
-    print("Could not reach this url!")
-    return None
-  
-  req.html.render()
-
-  full_text = None
-  with tempfile.NamedTemporaryFile(mode = "w") as tmp:
-    tmp.write(req.html.html)
-    tmp.seek(0)
-    loader = UnstructuredHTMLLoader(tmp.name)
-    data = loader.load()[0]
-    full_text = data.page_content
-    tmp.close()
-  return full_text
-
 def append_meta(publication, text):
   meta = {
     'url': publication.get('canonical_url'),
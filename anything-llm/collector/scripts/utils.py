@@ -1,10 +1,84 @@
-import tiktoken
-encoder = tiktoken.encoding_for_model("text-embedding-ada-002")
+_encoder = None
+# Long texts are encoded in windows of roughly this many characters so counting never holds
+# the token list for a whole document at once.
+COUNT_WINDOW_SIZE = 100_000
+
+# tiktoken is imported and the encoder built on first use, not when the collectors are imported.
+def get_encoder():
+  global _encoder
+  if _encoder is None:
+    import tiktoken
+    _encoder = tiktoken.encoding_for_model("text-embedding-ada-002")
+  return _encoder
 
 def tokenize(fullText):
-  return encoder.encode(fullText)
+  return get_encoder().encode(fullText)
+
+# Windows are only cut at a single space between two non-space characters. The BPE pre-tokenizer
+# always starts a new piece there, so the summed counts equal the count of the whole text.
+def count_windows(fullText, size = COUNT_WINDOW_SIZE):
+  start = 0
+  while len(fullText) - start > size:
+    cut = fullText.find(' ', start + size)
+    while cut != -1 and (fullText[cut - 1].isspace() or cut + 1 >= len(fullText) or fullText[cut + 1].isspace()):
+      cut = fullText.find(' ', cut + 1)
+    if cut == -1: break
+    yield fullText[start:cut]
+    start = cut
+  yield fullText[start:]
+
+def count_tokens(fullText):
+  encoder = get_encoder()
+  return sum(len(encoder.encode_ordinary(window)) for window in count_windows(fullText))
+
+# Counts many texts at once using tiktoken's threaded batch encoder.
+def count_tokens_batch(texts, num_threads = 8, batch_size = 64):
+  encoder = get_encoder()
+  counts = [0] * len(texts)
+  pending = []
+  def flush():
+    for (index, _), tokens in zip(pending, encoder.encode_ordinary_batch([window for _, window in pending], num_threads=num_threads)):
+      counts[index] += len(tokens)
+    pending.clear()
+
+  for index, fullText in enumerate(texts):
+    for window in count_windows(fullText):
+      pending.append((index, window))
+      if len(pending) >= batch_size: flush()
+  if len(pending) > 0: flush()
+  return counts
+
+# Splits a text into chunks of at most `size` tokens, each sharing `overlap` tokens with the one before.
+# Chunks are returned as character offsets into the text with their token counts, so the text itself is
+# not stored twice. A token can end part-way through a multi-byte character - that character is counted
+# wholly in the token holding its first byte, so it belongs to the earlier chunk and the next chunk starts
+# after it.
+def chunk_text(fullText, size, overlap = 0):
+  if overlap >= size: raise ValueError(f"Chunk overlap ({overlap}) must be smaller than the chunk size ({size}).")
+  encoder = get_encoder()
+  ends = []
+  offset = 0
+  for window in count_windows(fullText):
+    chars = offset
+    for token in encoder.encode_ordinary(window):
+      chars += sum(1 for byte in encoder.decode_single_token_bytes(token) if byte & 0xC0 != 0x80)
+      ends.append(chars)
+    offset += len(window)
+
+  chunks = []
+  start = 0
+  while start < len(ends):
+    end = min(start + size, len(ends))
+    chunks.append({
+      'start': ends[start - 1] if start > 0 else 0,
+      'end': ends[end - 1],
+      'token_count': end - start,
+    })
+    if end == len(ends): break
+    start = end - overlap
+  return chunks, len(ends)
 
 def ada_v2_cost(tokenCount):
   rate_per = 0.0004 / 1_000 # $0.0004 / 1K tokens
   total = tokenCount * rate_per
-  return '${:,.2f}'.format(total) if total >= 0.01 else '< $0.01'
\ No newline at end of file
+  return '${:,.2f}'.format(total) if total >= 0.01 else '< $0.01'
@@ -2,7 +2,8 @@ import os
 from langchain.document_loaders import Docx2txtLoader, UnstructuredODTLoader
 from slugify import slugify
 from ..utils import guid, file_creation_time, write_to_server_documents, move_source
-from ...utils import tokenize
+from ..dedup import file_hash, already_converted, record_documents
+from ...utils import count_tokens
 
 # Process all text-related documents.
 def as_docx(**kwargs):
@@ -10,6 +11,8 @@ def as_docx(**kwargs):
   filename = kwargs.get('filename')
   ext = kwargs.get('ext', '.txt')
   fullpath = f"{parent_dir}/{filename}{ext}"
+  content_hash = file_hash(fullpath)
+  if already_converted(content_hash, parent_dir, filename, ext): return
 
   loader = Docx2txtLoader(fullpath)
   data = loader.load()[0]
@@ -24,10 +27,11 @@ def as_docx(**kwargs):
     'published': file_creation_time(fullpath),
     'wordCount': len(content),
     'pageContent': content,
-    'token_count_estimate': len(tokenize(content))
+    'token_count_estimate': count_tokens(content)
   }
   
   write_to_server_documents(data, f"{slugify(filename)}-{data.get('id')}")
+  record_documents(content_hash, f"{filename}{ext}", [f"{slugify(filename)}-{data.get('id')}"])
   move_source(parent_dir, f"{filename}{ext}")
   print(f"[SUCCESS]: {filename}{ext} converted & ready for embedding.\n")
 
@@ -36,6 +40,8 @@ def as_odt(**kwargs):
   filename = kwargs.get('filename')
   ext = kwargs.get('ext', '.txt')
   fullpath = f"{parent_dir}/{filename}{ext}"
+  content_hash = file_hash(fullpath)
+  if already_converted(content_hash, parent_dir, filename, ext): return
 
   loader = UnstructuredODTLoader(fullpath)
   data = loader.load()[0]
@@ -50,9 +56,10 @@ def as_odt(**kwargs):
     'published': file_creation_time(fullpath),
     'wordCount': len(content),
     'pageContent': content,
-    'token_count_estimate': len(tokenize(content))
+    'token_count_estimate': count_tokens(content)
   }
   
   write_to_server_documents(data, f"{slugify(filename)}-{data.get('id')}")
+  record_documents(content_hash, f"{filename}{ext}", [f"{slugify(filename)}-{data.get('id')}"])
   move_source(parent_dir, f"{filename}{ext}")
   print(f"[SUCCESS]: {filename}{ext} converted & ready for embedding.\n")
\ No newline at end of file
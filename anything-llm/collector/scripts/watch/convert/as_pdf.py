@@ -1,8 +1,26 @@
 import os
-from langchain.document_loaders import PyPDFLoader
+from pypdf import PdfReader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
 from slugify import slugify
 from ..utils import guid, file_creation_time, write_to_server_documents, move_source
-from ...utils import tokenize
+from ..dedup import file_hash, already_converted, record_documents
+from ...utils import count_tokens_batch
+
+# Yields the chunks of one page at a time. Chunks match what PyPDFLoader.load_and_split() produced.
+# Given a path, PdfReader reads the whole file into memory, so it gets an open file instead. It also caches
+# every object it resolves, so the objects resolved for a page are dropped once the page is done - only the
+# page tree read up front stays cached. Memory then stays flat however many pages the document has.
+def pdf_pages(fullpath, text_splitter=None):
+  text_splitter = text_splitter or RecursiveCharacterTextSplitter()
+  with open(fullpath, "rb") as file:
+    reader = PdfReader(file)
+    pages = len(reader.pages)
+    page_tree = set(reader.resolved_objects)
+    for pg_num in range(pages):
+      chunks = text_splitter.split_text(reader.pages[pg_num].extract_text())
+      for key in [key for key in reader.resolved_objects if key not in page_tree]:
+        del reader.resolved_objects[key]
+      yield pg_num, chunks
 
 # Process all text-related documents.
 def as_pdf(**kwargs):
@@ -10,27 +28,29 @@ def as_pdf(**kwargs):
   filename = kwargs.get('filename')
   ext = kwargs.get('ext', '.txt')
   fullpath = f"{parent_dir}/{filename}{ext}"
-
-  loader = PyPDFLoader(fullpath)
-  pages = loader.load_and_split()
+  content_hash = file_hash(fullpath)
+  if already_converted(content_hash, parent_dir, filename, ext): return
 
   print(f"-- Working {fullpath} --")
-  for page in pages:
-    pg_num = page.metadata.get('page')
+  url = "file://"+os.path.abspath(f"{parent_dir}/processed/{filename}{ext}")
+  published = file_creation_time(fullpath)
+  documents = []
+  for pg_num, chunks in pdf_pages(fullpath):
     print(f"-- Working page {pg_num} --")
+    for content, token_count in zip(chunks, count_tokens_batch(chunks)):
+      data = {
+        'id': guid(), 
+        'url': url,
+        'title': f"{filename}_pg{pg_num}{ext}",
+        'description': "a custom file uploaded by the user.",
+        'published': published,
+        'wordCount': len(content),
+        'pageContent': content,
+        'token_count_estimate': token_count
+      }
+      write_to_server_documents(data, f"{slugify(filename)}-pg{pg_num}-{data.get('id')}")
+      documents.append(f"{slugify(filename)}-pg{pg_num}-{data.get('id')}")
 
-    content = page.page_content
-    data = {
-      'id': guid(), 
-      'url': "file://"+os.path.abspath(f"{parent_dir}/processed/{filename}{ext}"),
-      'title': f"{filename}_pg{pg_num}{ext}",
-      'description': "a custom file uploaded by the user.",
-      'published': file_creation_time(fullpath),
-      'wordCount': len(content),
-      'pageContent': content,
-      'token_count_estimate': len(tokenize(content))
-    }
-    write_to_server_documents(data, f"{slugify(filename)}-pg{pg_num}-{data.get('id')}")
-
+  record_documents(content_hash, f"{filename}{ext}", documents)
   move_source(parent_dir, f"{filename}{ext}")
-  print(f"[SUCCESS]: {filename}{ext} converted & ready for embedding.\n")
\ No newline at end of file
+  print(f"[SUCCESS]: {filename}{ext} converted & ready for embedding.\n")
@@ -0,0 +1,54 @@
+import os, json, hashlib, sqlite3
+from datetime import datetime
+from .utils import move_source
+from ..output import document_exists
+
+INDEX_PATH = "./outputs/document-index.db"
+DOCUMENTS_PATH = "../server/documents/custom-documents"
+
+def _connect():
+  if os.path.isdir(os.path.dirname(INDEX_PATH)) == False: os.makedirs(os.path.dirname(INDEX_PATH))
+  conn = sqlite3.connect(INDEX_PATH, timeout=30)
+  conn.execute("PRAGMA journal_mode=WAL")
+  conn.execute("CREATE TABLE IF NOT EXISTS documents (hash TEXT PRIMARY KEY, source TEXT, documents TEXT, created_at TEXT)")
+  return conn
+
+def file_hash(path_to_file):
+  digest = hashlib.sha256()
+  with open(path_to_file, 'rb') as file:
+    for block in iter(lambda: file.read(1024 * 1024), b''):
+      digest.update(block)
+  return digest.hexdigest()
+
+# Returns the documents previously written for this content, or None if they were never written
+# or have since been removed from the server.
+def find_documents(content_hash):
+  conn = _connect()
+  try:
+    row = conn.execute("SELECT documents FROM documents WHERE hash = ?", (content_hash,)).fetchone()
+  finally:
+    conn.close()
+
+  if row is None: return None
+  documents = json.loads(row[0])
+  if len(documents) == 0 or not all(document_exists(f"{DOCUMENTS_PATH}/{name}.json") for name in documents): return None
+  return documents
+
+def record_documents(content_hash, source, documents):
+  conn = _connect()
+  try:
+    with conn:
+      conn.execute(
+        "INSERT OR REPLACE INTO documents (hash, source, documents, created_at) VALUES (?, ?, ?, ?)",
+        (content_hash, source, json.dumps(documents), datetime.today().strftime('%Y-%m-%d %H:%M:%S'))
+      )
+  finally:
+    conn.close()
+
+def already_converted(content_hash, parent_dir, filename, ext):
+  documents = find_documents(content_hash)
+  if documents is None: return False
+
+  move_source(parent_dir, f"{filename}{ext}")
+  print(f"[SKIPPED]: {filename}{ext} is identical to the already converted document {documents[0]} - nothing to do.\n")
+  return True
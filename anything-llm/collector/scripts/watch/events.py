@@ -0,0 +1,59 @@
+import os, time
+
+# inotify is Linux-only - everywhere else we fall back to polling the hot directory.
+try:
+  from inotify_simple import INotify, flags
+except (ImportError, OSError, AttributeError):
+  INotify = None
+
+# The watch is set up before this returns, so a sweep of the directory made afterwards cannot miss a file:
+# anything dropped in during the sweep is reported by the returned iterator.
+def watch_events(directory, stop, mode='auto', interval=1):
+  if mode != 'poll' and INotify is not None:
+    try:
+      inotify = INotify()
+      inotify.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO)
+      print(f"Using inotify to watch '{directory}/'.")
+      return inotify_events(inotify, stop, interval)
+    except OSError as e:
+      print(f"Could not start inotify watcher ({e}) - falling back to polling.")
+  elif mode == 'inotify':
+    print("inotify is not available on this system - falling back to polling.")
+
+  print(f"Polling '{directory}/' every {interval}s.")
+  return polling_events(directory, stop, interval)
+
+# Only files that were closed after writing (or moved in whole) are reported.
+def inotify_events(inotify, stop, interval=1):
+  try:
+    while not stop:
+      for event in inotify.read(timeout=int(interval * 1000)):
+        if event.mask & flags.ISDIR: continue
+        yield event.name, time.monotonic()
+  finally:
+    inotify.close()
+
+# Without write-close events a file is reported once its size and mtime are unchanged across two scans.
+def polling_events(directory, stop, interval=1):
+  seen = {}
+  reported = set()
+  while not stop:
+    current = {}
+    for entry in os.scandir(directory):
+      try:
+        if not entry.is_file(): continue
+        stat = entry.stat()
+      except FileNotFoundError:
+        continue  # Removed between the scan and the stat
+      signature = (stat.st_size, stat.st_mtime_ns)
+      detected_at = seen.get(entry.name, (None, time.monotonic()))[1]
+      current[entry.name] = (signature, detected_at)
+
+      if entry.name in reported: continue
+      if seen.get(entry.name, (None,))[0] == signature:
+        reported.add(entry.name)
+        yield entry.name, detected_at
+
+    reported &= current.keys()
+    seen = current
+    time.sleep(interval)
@@ -1,12 +1,15 @@
-from .convert.as_text import as_text
-from .convert.as_markdown import as_markdown
-from .convert.as_pdf import as_pdf
-from .convert.as_docx import as_docx, as_odt
+from importlib import import_module
+
+# Converter modules are imported on first use so starting the watcher does not load langchain.
+def lazy_converter(module, name):
+  def convert(**kwargs):
+    return getattr(import_module(module, __package__), name)(**kwargs)
+  return convert
 
 FILETYPES = {
-    '.txt': as_text,
-    '.md': as_markdown,
-    '.pdf': as_pdf,
-    '.docx': as_docx,
-    '.odt': as_odt,
-}
\ No newline at end of file
+    '.txt': lazy_converter('.convert.as_text', 'as_text'),
+    '.md': lazy_converter('.convert.as_markdown', 'as_markdown'),
+    '.pdf': lazy_converter('.convert.as_pdf', 'as_pdf'),
+    '.docx': lazy_converter('.convert.as_docx', 'as_docx'),
+    '.odt': lazy_converter('.convert.as_docx', 'as_odt'),
+}
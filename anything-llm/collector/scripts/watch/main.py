@@ -1,20 +1,111 @@
-import os
+import os, time, threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from .filetypes import FILETYPES
+from ..sink import commit as commit_documents
 
 RESERVED = ['__HOTDIR__.md']
-def watch_for_changes(directory):
+# Heavy converters are capped so a batch of large PDFs cannot take every worker from plain-text files.
+EXTENSION_LIMITS = {'.pdf': 2, '.docx': 2, '.odt': 1}
+
+def should_convert(directory, raw_doc):
+  if raw_doc in RESERVED or not os.path.isfile(f"{directory}/{raw_doc}"): return False
+
+  filename, fileext = os.path.splitext(raw_doc)
+  if filename in ['.DS_Store'] or fileext == '': return False
+
+  if fileext not in FILETYPES.keys():
+    print(f"{fileext} not a supported file type for conversion. Please remove from hot directory.")
+    return False
+  return True
+
+def convert_file(directory, raw_doc, detected_at=None):
+  filename, fileext = os.path.splitext(raw_doc)
+  FILETYPES[fileext](
+    directory=directory,
+    filename=filename,
+    ext=fileext,
+  )
+  # Segment index entries are committed once per source file rather than once per document.
+  commit_documents()
+
+  if detected_at is not None:
+    print(f"[LATENCY]: {raw_doc} converted {(time.monotonic() - detected_at) * 1000:.0f}ms after it was detected.\n")
+
+def watch_for_changes(directory, pool=None):
   for raw_doc in os.listdir(directory):
-    if os.path.isdir(f"{directory}/{raw_doc}") or raw_doc in RESERVED: continue
+    if should_convert(directory, raw_doc) == False: continue
+    if pool is not None:
+      pool.submit(raw_doc)
+    else:
+      convert_file(directory, raw_doc)
+
+def parse_extension_limits(value):
+  limits = {}
+  for rule in (value or '').split(','):
+    if '=' not in rule: continue
+    ext, limit = rule.split('=', 1)
+    ext = ext.strip() if ext.strip().startswith('.') else f".{ext.strip()}"
+    limits[ext] = max(int(limit), 1)
+  return limits
+
+class ConversionPool:
+  def __init__(self, directory, max_workers=None, extension_limits=None):
+    self.directory = directory
+    self.max_workers = max_workers or os.cpu_count() or 1
+    self.extension_limits = {**EXTENSION_LIMITS, **(extension_limits or {})}
+    self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+    self.lock = threading.RLock()
+    self.claimed = set()
+    self.queued = {}
+    self.running = {}
+    self.closing = False
+
+  # A file is claimed from the moment it is queued until its conversion finishes, so repeated
+  # sweeps or duplicate events for the same file are ignored.
+  def submit(self, raw_doc, detected_at=None):
+    with self.lock:
+      if self.closing or raw_doc in self.claimed: return False
+      self.claimed.add(raw_doc)
+      fileext = os.path.splitext(raw_doc)[1]
+      self.queued.setdefault(fileext, deque()).append((raw_doc, detected_at))
+      self._dispatch()
+    return True
+
+  # Hands queued files to the executor round-robin across extensions. Caller must hold the lock.
+  def _dispatch(self):
+    if self.closing: return
+    in_flight = sum(self.running.values())
+    dispatched = True
+    while dispatched and in_flight < self.max_workers:
+      dispatched = False
+      for fileext, queue in self.queued.items():
+        if not queue or in_flight >= self.max_workers: continue
+        if self.running.get(fileext, 0) >= self.extension_limits.get(fileext, self.max_workers): continue
+
+        raw_doc, detected_at = queue.popleft()
+        future = self.executor.submit(convert_file, self.directory, raw_doc, detected_at)
+        self.running[fileext] = self.running.get(fileext, 0) + 1
+        in_flight += 1
+        dispatched = True
+        future.add_done_callback(partial(self._finished, raw_doc, fileext))
 
-    filename, fileext = os.path.splitext(raw_doc)
-    if filename in ['.DS_Store'] or fileext == '': continue
+  def _finished(self, raw_doc, fileext, future):
+    if future.exception() is not None:
+      print(f"[ERROR]: Could not convert {raw_doc} - {future.exception()}")
 
-    if fileext not in FILETYPES.keys():
-      print(f"{fileext} not a supported file type for conversion. Please remove from hot directory.")
-      continue
+    with self.lock:
+      self.running[fileext] -= 1
+      self.claimed.discard(raw_doc)
+      self._dispatch()
 
-    FILETYPES[fileext](
-      directory=directory,
-      filename=filename,
-      ext=fileext,
-    )
\ No newline at end of file
+  # Running conversions are finished, queued ones are left in the hot directory for the next start-up sweep.
+  def shutdown(self):
+    with self.lock:
+      self.closing = True
+      pending = [raw_doc for queue in self.queued.values() for raw_doc, _ in queue]
+      self.queued.clear()
+    if len(pending) > 0:
+      print(f"{len(pending)} queued files were not converted and will be picked up on the next start: {', '.join(pending)}")
+    self.executor.shutdown(wait=True)
@@ -1,6 +1,7 @@
-import os, json
+import os
 from datetime import datetime
 from uuid import uuid4
+from ..output import write_document
 
 def guid():
   return str(uuid4())
@@ -26,5 +27,4 @@ def move_source(working_dir='hotdir', new_destination_filename= ''):
 def write_to_server_documents(data, filename):
   destination = f"../server/documents/custom-documents"
   if os.path.exists(destination) == False: os.makedirs(destination)
-  with open(f"{destination}/{filename}.json", 'w', encoding='utf-8') as file:
-    json.dump(data, file, ensure_ascii=True, indent=4)
+  write_document(data, f"{destination}/{filename}.json")
@@ -1,20 +1,40 @@
-import os, json
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.formatters import TextFormatter, JSONFormatter
-from .utils import tokenize, ada_v2_cost
-from .yt_utils import fetch_channel_video_information, get_channel_id, clean_text, append_meta, get_duration
-from alive_progress import alive_it
+import os, time, random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.exceptions import HTTPError
+from youtube_transcript_api import YouTubeTranscriptApi, TooManyRequests, YouTubeRequestFailed, TranscriptsDisabled, NoTranscriptFound, NoTranscriptAvailable
+from youtube_transcript_api.formatters import TextFormatter
+from .utils import count_tokens, ada_v2_cost
+from .yt_utils import fetch_channel_video_information, get_channel_id, clean_text, append_meta, load_transcript_manifest, save_transcript_manifest
+from .http_client import http_summary
+from .output import write_document
+from alive_progress import alive_bar
+
+formatter = TextFormatter()
+MAX_RETRIES = 5
     
 # Example Channel URL https://www.youtube.com/channel/UCmWbhBB96ynOZuWG7LfKong
 # Example Channel URL https://www.youtube.com/@mintplex
 
 def youtube():
     channel_link = input("Paste in the URL of a YouTube channel: ")
+    result = collect_youtube(channel_link)
+    if result is None: exit(1)
+
+    print(http_summary())
+    print(f"[Success]: {result.get('documents')} video transcripts fetched!")
+    print(f"\n\n////////////////////////////")
+    print(f"Your estimated cost to embed all of this data using OpenAI's text-embedding-ada-002 model at $0.0004 / 1K tokens will cost {ada_v2_cost(result.get('tokens'))} using {result.get('tokens')} tokens.")
+    print(f"////////////////////////////\n\n")
+    exit(0)
+
+# Non-interactive collection of a channel - returns the documents written and their tokens, or None if the
+# channel could not be collected.
+def collect_youtube(channel_link):
     channel_id = get_channel_id(channel_link)
 
     if channel_id == None or len(channel_id) == 0:
         print("Invalid input - must be full YouTube channel URL")
-        exit(1)
+        return None
 
     channel_data = fetch_channel_video_information(channel_id)
     transaction_output_dir = f"../server/documents/youtube-{channel_data.get('channelTitle')}"
@@ -22,34 +42,63 @@ def youtube():
     if os.path.isdir(transaction_output_dir) == False:
       os.makedirs(transaction_output_dir)
 
-    print(f"\nFetching transcripts for {len(channel_data.get('items'))} videos - please wait.\nStopping and restarting will not refetch known transcripts in case there is an error.\nSaving results to: {transaction_output_dir}.")
+    manifest = load_transcript_manifest(channel_id, transaction_output_dir)
+    pending = [video for video in channel_data.get('items') if video.get('id') not in manifest]
+    print(f"\nFetching transcripts for {len(pending)} of {len(channel_data.get('items'))} videos - please wait.\nStopping and restarting will not refetch known, failed or caption-less videos in case there is an error (rate-limited ones are retried) - delete outputs/channel-logs/transcripts-{channel_id}.json to retry them.\nSaving results to: {transaction_output_dir}.")
+
     totalTokenCount = 0
-    for video in alive_it(channel_data.get('items')):
-      video_file_path = transaction_output_dir + f"/video-{video.get('id')}.json"
-      if os.path.exists(video_file_path) == True:
-        continue
-       
-      formatter = TextFormatter()
-      json_formatter = JSONFormatter()
+    documents = 0
+    concurrency = int(os.getenv('YT_TRANSCRIPT_CONCURRENCY', 8))
+    with ThreadPoolExecutor(max_workers=concurrency) as executor, alive_bar(len(pending)) as bar:
+      futures = [executor.submit(fetch_transcript, video, transaction_output_dir) for video in pending]
+      for completed, future in enumerate(as_completed(futures), start=1):
+        video_id, status, tokenCount = future.result()
+        if status != 'rate_limited': manifest[video_id] = status
+        totalTokenCount += tokenCount
+        if status == 'done': documents += 1
+        if completed % 50 == 0: save_transcript_manifest(channel_id, manifest)
+        bar()
+    save_transcript_manifest(channel_id, manifest)
+    return {'documents': documents, 'tokens': totalTokenCount}
+
+# YouTube answers bursts of requests with HTTP 429. youtube-transcript-api raises TooManyRequests only
+# for its captcha page - a plain 429 surfaces as YouTubeRequestFailed. That one is built with its
+# arguments swapped, so the HTTPError ends up in video_id and its message in reason.
+def is_rate_limited(error):
+  if isinstance(error, TooManyRequests): return True
+  if not isinstance(error, YouTubeRequestFailed): return False
+  for http_error in (error.video_id, getattr(error, 'http_error', None)):
+    if isinstance(http_error, HTTPError) and http_error.response is not None:
+      return http_error.response.status_code == 429
+  return '429' in str(getattr(error, 'reason', ''))
+
+# Returns (video id, manifest status, token count). Rate-limited requests are retried with exponential
+# backoff and jitter. A video that is still rate limited after that is reported as 'rate_limited' and
+# left out of the manifest, so the next run tries it again.
+def fetch_transcript(video, transaction_output_dir):
+    for attempt in range(MAX_RETRIES):
       try:
         transcript = YouTubeTranscriptApi.get_transcript(video.get('id'))
-        raw_text = clean_text(formatter.format_transcript(transcript))
-        duration = get_duration(json_formatter.format_transcript(transcript))
-
-        if(len(raw_text) > 0):
-          fullText = append_meta(video, duration, raw_text)
-          tokenCount = len(tokenize(fullText))
-          video['pageContent'] = fullText
-          video['token_count_estimate'] = tokenCount
-          totalTokenCount += tokenCount
-          with open(video_file_path, 'w', encoding='utf-8') as file:
-            json.dump(video, file, ensure_ascii=True, indent=4)
-      except:
-        print("There was an issue getting the transcription of a video in the list - likely because captions are disabled. Skipping")
-        continue
-    
-    print(f"[Success]: {len(channel_data.get('items'))} video transcripts fetched!")
-    print(f"\n\n////////////////////////////")
-    print(f"Your estimated cost to embed all of this data using OpenAI's text-embedding-ada-002 model at $0.0004 / 1K tokens will cost {ada_v2_cost(totalTokenCount)} using {totalTokenCount} tokens.")
-    print(f"////////////////////////////\n\n")
-    exit(0)
+        break
+      except (TranscriptsDisabled, NoTranscriptFound, NoTranscriptAvailable):
+        return video.get('id'), 'no_captions', 0
+      except Exception as e:
+        if is_rate_limited(e):
+          time.sleep(2 ** attempt + random.random())
+          continue
+        print(f"There was an issue getting the transcription of video {video.get('id')}. Skipping")
+        return video.get('id'), 'failed', 0
+    else:
+      print(f"Rate limited too many times fetching the transcription of video {video.get('id')}. Skipping for now")
+      return video.get('id'), 'rate_limited', 0
+
+    raw_text = clean_text(formatter.format_transcript(transcript))
+    if len(raw_text) == 0 or len(transcript) == 0: return video.get('id'), 'no_captions', 0
+
+    duration = transcript[-1].get('start')
+    fullText = append_meta(video, duration, raw_text)
+    tokenCount = count_tokens(fullText)
+    video['pageContent'] = fullText
+    video['token_count_estimate'] = tokenCount
+    write_document(video, transaction_output_dir + f"/video-{video.get('id')}.json")
+    return video.get('id'), 'done', tokenCount
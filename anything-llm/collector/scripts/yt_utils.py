@@ -1,13 +1,79 @@
-import json, requests, os, re
+import json, os, re
+from concurrent.futures import ThreadPoolExecutor
 from slugify import slugify
 from dotenv import load_dotenv
+from .http_client import get_session
 load_dotenv()
 
+SHORTS_CACHE_PATH = "./outputs/channel-logs/shorts-cache.json"
+# Shorts can be up to three minutes long - anything longer is a regular video without asking YouTube.
+SHORTS_MAX_DURATION = 180
+SHORTS_CONCURRENCY = 8
+
 def is_yt_short(videoId):
     url = 'https://www.youtube.com/shorts/' + videoId
-    ret = requests.head(url)
+    ret = get_session().head(url, timeout=20)
     return ret.status_code == 200
 
+def parse_duration(iso_duration):
+  match = re.match(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$", iso_duration or '')
+  if match is None: return None
+  days, hours, minutes, seconds = [int(value or 0) for value in match.groups()]
+  return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+# Durations for up to 50 videos per videos.list call.
+def fetch_video_durations(video_ids):
+  durations = {}
+  for start in range(0, len(video_ids), 50):
+    batch = video_ids[start:start + 50]
+    url = f"https://www.googleapis.com/youtube/v3/videos?key={os.getenv('GOOGLE_APIS_KEY')}&part=contentDetails&id={','.join(batch)}&maxResults=50"
+    req = get_session().get(url, timeout=20)
+    if(req.ok == False):
+      print("Could not fetch video durations - falling back to checking each video.")
+      continue
+    for item in req.json().get('items', []):
+      durations[item.get('id')] = parse_duration(item.get('contentDetails', {}).get('duration'))
+  return durations
+
+def load_shorts_cache():
+  if os.path.exists(SHORTS_CACHE_PATH) == False: return {}
+  with open(SHORTS_CACHE_PATH, "r") as file:
+    return json.load(file)
+
+def save_shorts_cache(cache):
+  if os.path.isdir(os.path.dirname(SHORTS_CACHE_PATH)) == False: os.makedirs(os.path.dirname(SHORTS_CACHE_PATH))
+  with open(SHORTS_CACHE_PATH, 'w', encoding='utf-8') as file:
+    json.dump(cache, file, separators=(',', ':'))
+
+# A video that cannot be checked is kept (treated as not a short) and left out of the cache so it is checked again next time.
+def check_short(video_id):
+  try:
+    return is_yt_short(video_id)
+  except Exception as e:
+    print(f"Could not check whether {video_id} is a YT Short ({e}) - keeping it.")
+    return None
+
+# Returns {videoId: is_short}. Known videos come from `cache`, long videos are ruled out in bulk from their
+# duration and only the remaining short ones are checked against youtube.com/shorts concurrently. New results
+# are added to `cache` - the caller saves it once it is done with the channel.
+def classify_shorts(video_ids, cache):
+  unknown = [video_id for video_id in video_ids if video_id not in cache]
+  if len(unknown) > 0:
+    durations = fetch_video_durations(unknown)
+    to_check = []
+    for video_id in unknown:
+      duration = durations.get(video_id)
+      if duration is not None and duration > SHORTS_MAX_DURATION:
+        cache[video_id] = False
+      else:
+        to_check.append(video_id)
+
+    with ThreadPoolExecutor(max_workers=SHORTS_CONCURRENCY) as executor:
+      for video_id, is_short in zip(to_check, executor.map(check_short, to_check)):
+        if is_short is not None: cache[video_id] = is_short
+
+  return {video_id: cache.get(video_id) for video_id in video_ids}
+
 def get_channel_id(channel_link):
   if('@' in channel_link):
     pattern = r'https?://www\.youtube\.com/(@\w+)/?'
@@ -15,7 +81,7 @@ def get_channel_id(channel_link):
     if match is False: return None
     handle = match.group(1)
     print('Need to map username to channelId - this can take a while sometimes.')
-    response = requests.get(f"https://yt.lemnoslife.com/channels?handle={handle}", timeout=20)
+    response = get_session().get(f"https://yt.lemnoslife.com/channels?handle={handle}", timeout=20)
 
     if(response.ok == False):
       print("Handle => ChannelId mapping endpoint is too slow - use regular youtube.com/channel URL")
@@ -46,6 +112,30 @@ def get_duration(json_str):
   data = json.loads(json_str)
   return data[-1].get('start')
 
+# Tracks which videos of a channel were already handled (done, failed or no_captions) so reruns do not
+# have to stat thousands of video-*.json files. Channels collected before the manifest existed are
+# seeded from a single listing of the output directory.
+def load_transcript_manifest(channel_id, transaction_output_dir):
+  file_path = f"./outputs/channel-logs/transcripts-{channel_id}.json"
+  if os.path.exists(file_path):
+    with open(file_path, "r") as file:
+      return json.load(file)
+
+  manifest = {}
+  for filename in os.listdir(transaction_output_dir):
+    if filename.startswith('video-') and filename.endswith('.json'):
+      manifest[filename[len('video-'):-len('.json')]] = 'done'
+  return manifest
+
+def save_transcript_manifest(channel_id, manifest):
+  if os.path.isdir("./outputs/channel-logs") == False:
+    os.makedirs("./outputs/channel-logs")
+
+  file_path = f"./outputs/channel-logs/transcripts-{channel_id}.json"
+  with open(f"{file_path}.tmp", 'w', encoding='utf-8') as file:
+    json.dump(manifest, file, separators=(',', ':'))
+  os.replace(f"{file_path}.tmp", file_path)
+
 def fetch_channel_video_information(channel_id, windowSize = 50):
     if channel_id == None or len(channel_id) == 0:
       print("No channel id provided!")
@@ -72,28 +162,33 @@ def fetch_channel_video_information(channel_id, windowSize = 50):
        'id': channel_id,
     }
 
+    # Shorts checks are cached across pages and saved once, even if a later page fails.
+    shorts_cache = load_shorts_cache()
+    shorts_cached = len(shorts_cache)
     print("Fetching first page of results...")
-    while(done == False):
-        url = f"https://www.googleapis.com/youtube/v3/search?key={os.getenv('GOOGLE_APIS_KEY')}&channelId={channel_id}&part=snippet,id&order=date&type=video&maxResults={windowSize}"
-        if(currentPage != None):
-           print(f"Fetching page ${currentPage}")
-           url += f"&pageToken={currentPage}"
-
-        req = requests.get(url)
-        if(req.ok == False):
-           print("Could not fetch channel_id items!")
-           exit(1)
-
-        response = req.json()
-        currentPage = response.get('nextPageToken')
-        if currentPage in pageTokens:
-          print('All pages iterated and logged!')
-          done = True
-          break
-
-        for item in response.get('items'):
-          if 'id' in item and 'videoId' in item.get('id'):
-            if is_yt_short(item.get('id').get('videoId')): 
+    try:
+      while(done == False):
+          url = f"https://www.googleapis.com/youtube/v3/search?key={os.getenv('GOOGLE_APIS_KEY')}&channelId={channel_id}&part=snippet,id&order=date&type=video&maxResults={windowSize}"
+          if(currentPage != None):
+             print(f"Fetching page ${currentPage}")
+             url += f"&pageToken={currentPage}"
+
+          req = get_session().get(url)
+          if(req.ok == False):
+             print("Could not fetch channel_id items!")
+             exit(1)
+
+          response = req.json()
+          currentPage = response.get('nextPageToken')
+          if currentPage in pageTokens:
+            print('All pages iterated and logged!')
+            done = True
+            break
+
+          video_items = [item for item in response.get('items') if 'id' in item and 'videoId' in item.get('id')]
+          shorts = classify_shorts([item.get('id').get('videoId') for item in video_items], shorts_cache)
+          for item in video_items:
+            if shorts.get(item.get('id').get('videoId')): 
               print(f"Filtering out YT Short {item.get('id').get('videoId')}")
               continue
 
@@ -110,7 +205,9 @@ def fetch_channel_video_information(channel_id, windowSize = 50):
             }
             items.append(newItem)
         
-        pageTokens.append(currentPage)
+          pageTokens.append(currentPage)
+    finally:
+      if len(shorts_cache) != shorts_cached: save_shorts_cache(shorts_cache)
 
     data['items'] = items
     with open(file_path, 'w+', encoding='utf-8') as json_file:
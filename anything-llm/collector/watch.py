@@ -1,5 +1,6 @@
-import _thread, time
-from scripts.watch.main import watch_for_changes
+import _thread, os
+from scripts.watch.main import watch_for_changes, should_convert, parse_extension_limits, ConversionPool
+from scripts.watch.events import watch_events
 
 a_list = []
 WATCH_DIRECTORY = "hotdir"
@@ -10,12 +11,21 @@ def input_thread(a_list):
 def main():
   _thread.start_new_thread(input_thread, (a_list,))
   print(f"Watching '{WATCH_DIRECTORY}/' for new files.\n\nUpload files into this directory while this script is running to convert them.\nPress enter or crtl+c to exit script.")
-  while not a_list:
-    watch_for_changes(WATCH_DIRECTORY)
-    time.sleep(1)
-  
-  print("Stopping watching of hot directory.")
+
+  workers = int(os.getenv('WATCH_WORKERS', 0)) or None
+  pool = ConversionPool(WATCH_DIRECTORY, workers, parse_extension_limits(os.getenv('WATCH_EXTENSION_LIMITS')))
+
+  # Start watching before converting anything that was dropped in while we were not running, so files
+  # added during that sweep are not missed.
+  events = watch_events(WATCH_DIRECTORY, a_list, mode=os.getenv('WATCH_MODE', 'auto'))
+  watch_for_changes(WATCH_DIRECTORY, pool)
+  for raw_doc, detected_at in events:
+    if should_convert(WATCH_DIRECTORY, raw_doc) == False: continue
+    pool.submit(raw_doc, detected_at)
+
+  print("Stopping watching of hot directory - waiting for running conversions to finish.")
+  pool.shutdown()
   exit(1)
 
 if __name__ == "__main__":
-  main()
\ No newline at end of file
+  main()
@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Any, List, Optional
+from pydantic import Field
+from crewai import Agent, Task
+from crewai.agents.agent_builder.base_agent import BaseAgent
+
+
+class ResponseCache:
+    """Persistent SQLite cache of task outputs with TTL and size-based (least recently used) eviction"""
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.path = path or os.getenv('COUNCIL_CACHE_PATH', '.council_cache/responses.db')
+        self.ttl = ttl if ttl is not None else float(os.getenv('COUNCIL_CACHE_TTL', 7 * 24 * 60 * 60))
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv('COUNCIL_CACHE_MAX_MB', 100)) * 1024 * 1024)
+
+    def _connect(self) -> sqlite3.Connection:
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, task TEXT, context_hash TEXT, output TEXT, size INTEGER, created_at REAL, used_at REAL)"
+        )
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT output, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if time.time() - row[1] > self.ttl:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+                return row[0]
+        finally:
+            conn.close()
+
+    def put(self, key: str, task: str, context_hash: str, output: str) -> None:
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, task, context_hash, output, size, created_at, used_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, task, context_hash, output, len(output.encode('utf-8')), now, now)
+                )
+                self._evict(conn, now)
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY used_at").fetchall():
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM responses")
+        finally:
+            conn.close()
+
+
+def context_hash(context: Optional[str]) -> str:
+    return hashlib.sha256((context or '').encode('utf-8')).hexdigest()
+
+
+def cache_key(task: Task, agent: BaseAgent, context: Optional[str], tools: Optional[List[Any]] = None) -> str:
+    """Key on everything that shapes the response: the rendered task, the executing agent and its model and tools,
+    and the upstream outputs"""
+    llm = getattr(agent, 'llm', None)
+    payload = {
+        'description': task.description,
+        'expected_output': task.expected_output,
+        'output_format': task._get_output_format().value,
+        'agent': {
+            'role': agent.role,
+            'goal': agent.goal,
+            'backstory': agent.backstory,
+            'model': getattr(llm, 'model', None) or str(llm),
+            'temperature': getattr(llm, 'temperature', None),
+        },
+        'tools': sorted((tool.name, tool.description) for tool in tools or []),
+        'context': context_hash(context),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class CachedTask(Task):
+    """Task whose response may be served from a ResponseCache by the CachedAgent executing it"""
+
+    response_cache: Optional[Any] = Field(default=None, exclude=True, description="ResponseCache to read and store outputs")
+
+
+class CachedAgent(Agent):
+    """Agent that reuses a previous response when the task's prompt, the agent and the upstream context are unchanged
+
+    Only the agent's answer is cached - crewAI still turns it into the task output, so guardrails, callbacks,
+    output files and events behave as for a fresh answer. Because cached responses are returned verbatim,
+    downstream tasks see the same context and hit the cache too - only the tasks downstream of an actual change
+    are recomputed.
+    """
+
+    def execute_task(self, task: Task, context: Optional[str] = None, tools: Optional[List[Any]] = None) -> str:
+        cache = getattr(task, 'response_cache', None)
+        if cache is None:
+            return super().execute_task(task, context, tools)
+
+        key = cache_key(task, self, context, tools)
+        cached = cache.get(key)
+        if cached is not None:
+            # stderr, as stdout may carry the event stream
+            print(f"[cache] {task.name or task.description[:40]}: reusing the cached response", file=sys.stderr)
+            return cached
+
+        result = super().execute_task(task, context, tools)
+        cache.put(key, task.name or task.description, context_hash(context), result)
+        return result
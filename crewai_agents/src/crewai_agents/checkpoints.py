@@ -0,0 +1,71 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+from crewai.tasks.task_output import TaskOutput
+
+
+def run_key(inputs: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class CheckpointStore:
+    """Keeps the latest output of every task per set of kickoff inputs, with the config it was produced by"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('COUNCIL_CHECKPOINT_PATH', '.council_cache/checkpoints.db')
+
+    def _connect(self) -> sqlite3.Connection:
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS runs (run_key TEXT PRIMARY KEY, inputs TEXT, updated_at REAL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "run_key TEXT, task TEXT, config_hash TEXT, output TEXT, updated_at REAL, PRIMARY KEY (run_key, task))"
+        )
+        return conn
+
+    def record_run(self, inputs: Dict[str, Any]) -> str:
+        key = run_key(inputs)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO runs (run_key, inputs, updated_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(inputs, sort_keys=True, default=str), time.time())
+                )
+        finally:
+            conn.close()
+        return key
+
+    def latest_inputs(self) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT inputs FROM runs ORDER BY updated_at DESC LIMIT 1").fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+    def save(self, key: str, output: TaskOutput, config_hash: str) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints (run_key, task, config_hash, output, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, output.name, config_hash, output.raw, time.time())
+                )
+        finally:
+            conn.close()
+
+    def load(self, key: str) -> Dict[str, Tuple[str, str]]:
+        """Task name -> (config hash, raw output) for one run"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT task, config_hash, output FROM checkpoints WHERE run_key = ?", (key,)).fetchall()
+        finally:
+            conn.close()
+        return {task: (config_hash, output) for task, config_hash, output in rows}
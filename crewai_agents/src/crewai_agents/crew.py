@@ -1,118 +1,167 @@
+import os
+import json
+import hashlib
+import yaml
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
-from typing import Dict, Any, List
+from crewai.crews.crew_output import CrewOutput
+from crewai.project import CrewBase, after_kickoff, agent, before_kickoff, crew, task
+from crewai.tasks.task_output import TaskOutput
+from typing import Callable, Dict, Any, List, Optional
 from datetime import datetime
 from .schemas import AlignmentReport, CouncilDecision
+from .dag import descendants, schedule
+from .cache import CachedAgent, CachedTask, ResponseCache
+from .checkpoints import CheckpointStore
+from .events import EventEmitter
+
+EXECUTION_MODES = ('hierarchical', 'dag')
 
 @CrewBase
 class AICouncilCrew():
     """Orchestration crew for AI alignment and governance"""
 
-    def __init__(self):
-        self.manager_agent = Agent(
+    def __init__(
+        self,
+        execution_mode: Optional[str] = None,
+        output_dir: Optional[str] = None,
+        cache: Optional[bool] = None,
+        verbose: bool = True,
+        memory: bool = True,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        # 'hierarchical' lets the manager agent coordinate every task. 'dag' skips the manager and runs the
+        # tasks in dependency order, with independent tasks running concurrently (see dag.py).
+        self.execution_mode = execution_mode or os.getenv('COUNCIL_EXECUTION_MODE', 'hierarchical')
+        if self.execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{self.execution_mode}', expected one of {', '.join(EXECUTION_MODES)}")
+        # Task artifacts are written here instead of the working directory. It may contain {placeholders}
+        # that are filled from the kickoff inputs, so one crew can be reused for many topics.
+        self.output_dir = output_dir
+        # Task outputs can be cached on disk (see cache.py) - enabled here or with COUNCIL_CACHE=1.
+        cache = cache if cache is not None else os.getenv('COUNCIL_CACHE', '0') in ('1', 'true')
+        self.response_cache = ResponseCache() if cache else None
+        # Every task's output is checkpointed per set of inputs so later runs can replay part of the pipeline.
+        self.checkpoints = CheckpointStore()
+        self.run_key = None
+        self.fingerprints = {}
+        # Agents and crews log to stdout when verbose - turn it off when stdout carries the event stream.
+        self.verbose = verbose
+        # Crew memory persists between kickoffs, so a crew reused for unrelated runs should turn it off.
+        self.memory = memory
+        # on_event receives run_started, task_completed (as soon as each task finishes) and run_completed events.
+        self.events = EventEmitter(on_event)
+        self.manager_agent = CachedAgent(
             role="Council Manager",
             goal="Coordinate the council's decision-making process",
             backstory="An experienced mediator who ensures all council members work together effectively",
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False
         )
 
+    def output_path(self, filename: str) -> str:
+        return os.path.join(self.output_dir, filename) if self.output_dir else filename
+
     @agent
     def thought_simulator(self) -> Agent:
-        return Agent(
+        return CachedAgent(
             config=self.agents_config['thought_simulator'],
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False
         )
 
     @agent
     def thought_evaluator(self) -> Agent:
-        return Agent(
+        return CachedAgent(
             config=self.agents_config['thought_evaluator'],
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False
         )
 
     @agent
     def governance_agent(self) -> Agent:
-        return Agent(
+        return CachedAgent(
             config=self.agents_config['governance_agent'],
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False
         )
 
     @agent
     def strategy_agent(self) -> Agent:
-        return Agent(
+        return CachedAgent(
             config=self.agents_config['strategy_agent'],
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False
         )
 
     @agent
     def quality_agent(self) -> Agent:
-        return Agent(
+        return CachedAgent(
             config=self.agents_config['quality_agent'],
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False
         )
 
     @agent
     def drift_detector(self) -> Agent:
-        return Agent(
+        return CachedAgent(
             config=self.agents_config['drift_detector'],
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False
         )
 
     @agent
     def prompt_engineer(self) -> Agent:
-        return Agent(
+        return CachedAgent(
             config=self.agents_config['prompt_engineer'],
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False
         )
 
     @task
     def simulate_thoughts(self) -> Task:
-        return Task(
+        return CachedTask(
             config=self.tasks_config['simulate_thoughts'],
-            output_file='thought_simulation.md',
+            response_cache=self.response_cache,
+            output_file=self.output_path('thought_simulation.md'),
             agent=self.thought_simulator()
         )
 
     @task
     def evaluate_alignment(self) -> Task:
-        return Task(
+        return CachedTask(
             config=self.tasks_config['evaluate_alignment'],
-            output_file='alignment_report.json',
+            response_cache=self.response_cache,
+            output_file=self.output_path('alignment_report.json'),
             agent=self.thought_evaluator(),
             context=[self.simulate_thoughts()]
         )
 
     @task
     def governance_review(self) -> Task:
-        return Task(
+        return CachedTask(
             config=self.tasks_config['governance_review'],
-            output_file='governance_assessment.json',
+            response_cache=self.response_cache,
+            output_file=self.output_path('governance_assessment.json'),
             agent=self.governance_agent(),
             context=[self.evaluate_alignment()]
         )
 
     @task
     def strategy_review(self) -> Task:
-        return Task(
+        return CachedTask(
             config=self.tasks_config['strategy_review'],
-            output_file='strategy_assessment.json',
+            response_cache=self.response_cache,
+            output_file=self.output_path('strategy_assessment.json'),
             agent=self.strategy_agent(),
             context=[self.evaluate_alignment()]
         )
 
     @task
     def quality_audit(self) -> Task:
-        return Task(
+        return CachedTask(
             config=self.tasks_config['quality_audit'],
-            output_file='quality_report.json',
+            response_cache=self.response_cache,
+            output_file=self.output_path('quality_report.json'),
             agent=self.quality_agent(),
             context=[
                 self.governance_review(),
@@ -122,51 +171,169 @@ class AICouncilCrew():
 
     @task
     def detect_drift(self) -> Task:
-        return Task(
+        return CachedTask(
             config=self.tasks_config['detect_drift'],
-            output_file='drift_report.json',
+            response_cache=self.response_cache,
+            output_file=self.output_path('drift_report.json'),
             agent=self.drift_detector(),
             context=[self.quality_audit()]
         )
 
     @task
     def correct_prompts(self) -> Task:
-        return Task(
+        return CachedTask(
             config=self.tasks_config['correct_prompts'],
-            output_file='prompt_corrections.md',
+            response_cache=self.response_cache,
+            output_file=self.output_path('prompt_corrections.md'),
             agent=self.prompt_engineer(),
             context=[self.detect_drift()]
         )
 
+    def council_agents(self) -> List[Agent]:
+        return [
+            self.thought_simulator(),
+            self.thought_evaluator(),
+            self.governance_agent(),
+            self.strategy_agent(),
+            self.quality_agent(),
+            self.drift_detector(),
+            self.prompt_engineer()
+        ]
+
+    def council_tasks(self) -> List[Task]:
+        return [
+            self.simulate_thoughts(),
+            self.evaluate_alignment(),
+            self.governance_review(),
+            self.strategy_review(),
+            self.quality_audit(),
+            self.detect_drift(),
+            self.correct_prompts()
+        ]
+
+    def task_fingerprints(self) -> Dict[str, str]:
+        """Hash of each task's YAML config together with its agent's, to detect tasks whose prompts changed"""
+        config_dir = os.path.join(os.path.dirname(__file__), 'config')
+        with open(os.path.join(config_dir, 'tasks.yaml'), 'r', encoding='utf-8') as file:
+            tasks_config = yaml.safe_load(file)
+        with open(os.path.join(config_dir, 'agents.yaml'), 'r', encoding='utf-8') as file:
+            agents_config = yaml.safe_load(file)
+
+        fingerprints = {}
+        for name, config in tasks_config.items():
+            source = {'task': config, 'agent': agents_config.get(config.get('agent'))}
+            fingerprints[name] = hashlib.sha256(json.dumps(source, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        return fingerprints
+
+    @before_kickoff
+    def start_run(self, inputs: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        self.run_key = self.checkpoints.record_run(inputs or {})
+        self.fingerprints = self.task_fingerprints()
+        self.events.run_started(inputs)
+        return inputs
+
+    @after_kickoff
+    def finish_run(self, result: CrewOutput) -> CrewOutput:
+        self.events.emit('run_completed', token_usage=result.token_usage.model_dump() if result.token_usage else None)
+        return result
+
+    def task_completed(self, output: TaskOutput) -> None:
+        if self.run_key is not None:
+            self.checkpoints.save(self.run_key, output, self.fingerprints.get(output.name, ''))
+        task = next((task for task in self.council_tasks() if task.name == output.name), None)
+        # Hierarchical tasks run one at a time, with the manager delegating to any council member, so every agent's
+        # usage since the previous task belongs to this one. DAG tasks may run concurrently, each by its own agent.
+        agents = self.council_agents() + [self.manager_agent]
+        if self.execution_mode == 'dag':
+            agents = [agent for agent in agents if agent.role == output.agent]
+        self.events.task_completed(output, agents, task.output_file if task else None)
+
     @crew
     def crew(self) -> Crew:
         """Creates the AI Governance Council crew"""
+        agents = self.council_agents()
+        tasks = self.council_tasks()
+
+        if self.execution_mode == 'dag':
+            return Crew(
+                agents=agents,
+                tasks=schedule(tasks),
+                process=Process.sequential,
+                verbose=self.verbose,
+                full_output=True,
+                memory=self.memory,
+                task_callback=self.task_completed
+            )
+
         return Crew(
-            agents=[
-                self.thought_simulator(),
-                self.thought_evaluator(),
-                self.governance_agent(),
-                self.strategy_agent(),
-                self.quality_agent(),
-                self.drift_detector(),
-                self.prompt_engineer()
-            ],
-            tasks=[
-                self.simulate_thoughts(),
-                self.evaluate_alignment(),
-                self.governance_review(),
-                self.strategy_review(),
-                self.quality_audit(),
-                self.detect_drift(),
-                self.correct_prompts()
-            ],
+            agents=agents,
+            tasks=tasks,
             process=Process.hierarchical,
             manager_agent=self.manager_agent,  # Using separate manager agent
-            verbose=True,
+            verbose=self.verbose,
             full_output=True,
-            memory=True
+            memory=self.memory,
+            task_callback=self.task_completed
         )
 
+    def replay(self, from_task: Optional[str] = None, inputs: Optional[Dict[str, Any]] = None) -> Optional[CrewOutput]:
+        """Re-run part of the council from checkpoints
+
+        Runs `from_task` and everything downstream of it. Without `from_task`, runs the tasks whose config
+        changed since they were checkpointed and everything downstream of those. Tasks without a checkpoint
+        for these inputs, and their downstream tasks, always run. All other tasks are reloaded from the
+        checkpoint store instead of being run. Uses the inputs of the
+        most recent run unless `inputs` are given. Returns None when there is nothing to re-run.
+        """
+        inputs = inputs or self.checkpoints.latest_inputs()
+        if inputs is None:
+            raise ValueError("No checkpointed run to replay - run the crew first")
+
+        tasks = self.council_tasks()
+        names = [task.name for task in tasks]
+        if from_task is not None and from_task not in names:
+            raise ValueError(f"Unknown task '{from_task}', expected one of {', '.join(names)}")
+
+        self.run_key = self.checkpoints.record_run(inputs)
+        self.fingerprints = self.task_fingerprints()
+        self.events.run_started(inputs)
+        saved = self.checkpoints.load(self.run_key)
+        if from_task is not None:
+            changed = [from_task]
+        else:
+            changed = [name for name in names if name not in saved or saved[name][0] != self.fingerprints.get(name)]
+
+        # Tasks that never completed for these inputs (e.g. a new topic, or a run that failed partway) have
+        # nothing to reload, so they run as well.
+        missing = [name for name in names if name not in saved]
+        affected = descendants(tasks, changed + missing)
+        if not affected:
+            return None
+
+        affected_ids = {id(task) for task in affected}
+        completed = [task for task in tasks if id(task) not in affected_ids]
+        for task in completed:
+            task.output = TaskOutput(
+                name=task.name,
+                description=task.description,
+                expected_output=task.expected_output,
+                raw=saved[task.name][1],
+                agent=task.agent.role
+            )
+        # An explicitly replayed task is re-run even if its prompt and inputs are unchanged.
+        if from_task is not None:
+            next(task for task in affected if task.name == from_task).response_cache = None
+
+        result = Crew(
+            agents=self.council_agents(),
+            tasks=schedule(affected, completed),
+            process=Process.sequential,
+            verbose=self.verbose,
+            full_output=True,
+            memory=self.memory,
+            task_callback=self.task_completed
+        ).kickoff(inputs=inputs)
+        return self.finish_run(result)
 
 
 # #from crewai import Crew, Process
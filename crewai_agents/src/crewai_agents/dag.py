@@ -0,0 +1,67 @@
+from typing import Dict, Iterable, List, Optional
+from crewai import Task
+
+
+def task_levels(tasks: List[Task], completed: Optional[Iterable[Task]] = None) -> List[List[Task]]:
+    """Groups tasks into levels so that every task's context lies in an earlier level.
+
+    Tasks within a level do not depend on each other and can run at the same time. Context tasks that
+    are not in `tasks` must be listed in `completed`, e.g. when replaying part of a crew.
+    """
+    position: Dict[int, int] = {id(task): index for index, task in enumerate(tasks)}
+    finished = {id(task) for task in completed or []}
+    level_of: Dict[int, int] = {}
+
+    def level(task: Task, path: tuple = ()) -> int:
+        if id(task) in level_of:
+            return level_of[id(task)]
+        if id(task) in path:
+            raise ValueError(f"Task '{task.name}' depends on itself through its context")
+        upstream = []
+        # Tasks without a context default to a sentinel rather than an empty list.
+        for dependency in task.context if isinstance(task.context, list) else []:
+            if id(dependency) in finished:
+                continue
+            if id(dependency) not in position:
+                raise ValueError(f"Task '{task.name}' has '{dependency.name}' in its context, but it is not part of the crew")
+            upstream.append(level(dependency, path + (id(task),)))
+        level_of[id(task)] = max(upstream, default=-1) + 1
+        return level_of[id(task)]
+
+    levels: List[List[Task]] = []
+    for task in tasks:
+        index = level(task)
+        while len(levels) <= index:
+            levels.append([])
+    for task in tasks:
+        levels[level_of[id(task)]].append(task)
+    return levels
+
+
+def schedule(tasks: List[Task], completed: Optional[Iterable[Task]] = None) -> List[Task]:
+    """Orders tasks level by level and marks the ones that can run concurrently as async.
+
+    A sequential crew runs async tasks in the background until it reaches the next synchronous
+    task, which waits for all of them. A level of several tasks therefore runs concurrently when
+    it is followed by a single-task level that joins it. When the next level is itself parallel
+    there is no task to join on, so such a level runs one task at a time. `completed` is passed on to
+    task_levels.
+    """
+    levels = task_levels(tasks, completed)
+    ordered: List[Task] = []
+    for index, level in enumerate(levels):
+        joined = index + 1 < len(levels) and len(levels[index + 1]) == 1
+        for task in level:
+            task.async_execution = len(level) > 1 and joined
+            ordered.append(task)
+    return ordered
+
+
+def descendants(tasks: List[Task], names: Iterable[str]) -> List[Task]:
+    """The named tasks and every task that depends on them, directly or indirectly, in crew order"""
+    affected = set(names)
+    for task in tasks:
+        context = task.context if isinstance(task.context, list) else []
+        if any(dependency.name in affected for dependency in context):
+            affected.add(task.name)
+    return [task for task in tasks if task.name in affected]
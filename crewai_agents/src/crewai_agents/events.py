@@ -0,0 +1,122 @@
+import sys
+import json
+import time
+import asyncio
+import threading
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, TextIO
+from crewai.agents.agent_builder.base_agent import BaseAgent
+from crewai.tasks.task_output import TaskOutput
+
+EventHandler = Callable[[Dict[str, Any]], None]
+
+
+def agent_usage(agent: BaseAgent) -> Optional[Dict[str, int]]:
+    """An agent's token usage so far
+
+    crewAI keeps per-agent usage only in the agent's private token counter, the one Crew.calculate_usage_metrics
+    sums up, so this is the single place that reads it.
+    """
+    token_process = getattr(agent, '_token_process', None)
+    return token_process.get_summary().model_dump() if token_process is not None else None
+
+
+class EventEmitter:
+    """Turns council progress into events, attributing token usage to the agents that spent it
+
+    Each task_completed event carries the tokens the given agents used since their previous event. As long as
+    every agent that worked on a task is passed for it, the events of a run add up to the crew's total usage.
+    """
+
+    def __init__(self, on_event: Optional[EventHandler] = None):
+        self.on_event = on_event
+        self.started = time.monotonic()
+        self.usage: Dict[int, Dict[str, int]] = {}
+        self.lock = threading.Lock()
+
+    def event(self, event: str, **fields: Any) -> Dict[str, Any]:
+        return {
+            'event': event,
+            'timestamp': datetime.now().isoformat(),
+            'elapsed': round(time.monotonic() - self.started, 2),
+            **fields
+        }
+
+    def emit(self, event: str, **fields: Any) -> None:
+        if self.on_event is not None:
+            self.on_event(self.event(event, **fields))
+
+    def run_started(self, inputs: Optional[Dict[str, Any]]) -> None:
+        self.started = time.monotonic()
+        self.emit('run_started', inputs=inputs)
+
+    def task_completed(self, output: TaskOutput, agents: List[BaseAgent], output_file: Optional[str] = None) -> None:
+        """Emits a finished task with the tokens `agents` spent since their previous event"""
+        if self.on_event is None:
+            return
+        self.emit(
+            'task_completed',
+            task=output.name,
+            agent=output.agent,
+            output=output.raw,
+            json=output.json_dict,
+            output_file=output_file,
+            token_usage=self.usage_delta(agents)
+        )
+
+    def usage_delta(self, agents: List[BaseAgent]) -> Optional[Dict[str, int]]:
+        delta: Optional[Dict[str, int]] = None
+        for agent in agents:
+            current = agent_usage(agent)
+            if current is None:
+                continue
+            with self.lock:
+                previous = self.usage.get(id(agent), {})
+                self.usage[id(agent)] = current
+            delta = delta or {}
+            for key, value in current.items():
+                delta[key] = delta.get(key, 0) + value - previous.get(key, 0)
+        return delta
+
+
+def jsonl_printer(stream: TextIO = sys.stdout) -> EventHandler:
+    """Event handler writing one JSON object per line, safe to call from concurrent tasks"""
+    lock = threading.Lock()
+
+    def write(event: Dict[str, Any]) -> None:
+        line = json.dumps(event, default=str)
+        with lock:
+            stream.write(line + "\n")
+            stream.flush()
+    return write
+
+
+async def stream_events(council: Any, inputs: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """Run an AICouncilCrew in a worker thread and yield its events as they happen
+
+    Raises the crew's exception, if any, after its run_failed event has been yielded. A consumer that stops
+    iterating early stops receiving events, but the crew itself runs to completion in its thread.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def forward(event: Dict[str, Any]) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+        except RuntimeError:
+            pass  # The consumer's loop is closed - nobody is listening any more
+
+    council.events.on_event = forward
+    try:
+        crew = council.crew()
+        run = asyncio.ensure_future(asyncio.to_thread(crew.kickoff, inputs=inputs))
+        run.add_done_callback(lambda _: queue.put_nowait(None))
+        while (event := await queue.get()) is not None:
+            yield event
+
+        error = run.exception()
+        if error is not None:
+            yield council.events.event('run_failed', error=str(error))
+            raise error
+    finally:
+        council.events.on_event = None
@@ -1,6 +1,15 @@
+import os
+import re
 import sys
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from typing import Dict, List, Set
 from .crew import AICouncilCrew
+from .events import EventEmitter, jsonl_printer
 
 def run(topic: str = "AI governance framework"):
     """Execute the full council evaluation workflow"""
@@ -8,21 +17,201 @@ def run(topic: str = "AI governance framework"):
         'topic': topic,
         'current_year': str(datetime.now().year)
     }
-    
+
+    def print_output(event: Dict):
+        if event['event'] == 'task_completed':
+            print(f"\n=== {event['task']} finished: {event['output_file'] or 'no output file'} ===")
+
     try:
-        crew = AICouncilCrew().crew()
-        result = crew.kickoff(inputs=inputs)
-        
+        crew = AICouncilCrew(on_event=print_output).crew()
+        crew.kickoff(inputs=inputs)
+
         print("\n=== Workflow Results ===")
         print(f"Final Outputs:")
-        for task_name, output_path in result.outputs.items():
-            print(f"- {task_name}: {output_path}")
-        
+        for task in crew.tasks:
+            print(f"- {task.name}: {task.output_file}")
+
         return True
     except Exception as e:
         print(f"\nError in workflow execution: {str(e)}", file=sys.stderr)
         return False
 
+def stream():
+    """Run the council and stream its events to stdout as JSON lines
+
+    Usage: stream [topic]
+
+    Emits run_started, one task_completed per task as soon as it finishes (with its output and the
+    tokens spent on it), and run_completed or run_failed. Agent logging is turned off so stdout
+    carries nothing but events.
+    """
+    inputs = {
+        'topic': sys.argv[1] if len(sys.argv) > 1 else "AI governance framework",
+        'current_year': str(datetime.now().year)
+    }
+    council = AICouncilCrew(verbose=False, on_event=jsonl_printer())
+    try:
+        council.crew().kickoff(inputs=inputs)
+    except Exception as e:
+        council.events.emit('run_failed', error=str(e))
+        sys.exit(1)
+
+def replay():
+    """Re-run part of the council from checkpoints
+
+    Usage: replay [task name] [topic]
+
+    With a task name, re-runs that task and everything downstream of it. Without one, re-runs the tasks
+    whose config in config/tasks.yaml or config/agents.yaml changed since the last run, plus everything
+    downstream of them. Upstream outputs are reloaded from the checkpoint store. Replays the most recent
+    run unless a topic is given.
+    """
+    from_task = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] else None
+    inputs = None
+    if len(sys.argv) > 2:
+        inputs = {'topic': sys.argv[2], 'current_year': str(datetime.now().year)}
+
+    try:
+        result = AICouncilCrew().replay(from_task=from_task, inputs=inputs)
+    except Exception as e:
+        print(f"\nError while replaying the council: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    if result is None:
+        print("Nothing changed since the last run - all task outputs are up to date.")
+        return
+    print("\n=== Replay Results ===")
+    print(result.raw)
+
+def train():
+    """Train the council for a given number of iterations
+
+    Usage: train <iterations> <filename> [topic]
+    """
+    inputs = {
+        'topic': sys.argv[3] if len(sys.argv) > 3 else "AI governance framework",
+        'current_year': str(datetime.now().year)
+    }
+    try:
+        AICouncilCrew().crew().train(n_iterations=int(sys.argv[1]), filename=sys.argv[2], inputs=inputs)
+    except Exception as e:
+        print(f"\nError while training the council: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+def test():
+    """Test the council for a given number of iterations and evaluate the results
+
+    Usage: test <iterations> <evaluation model> [topic]
+    """
+    inputs = {
+        'topic': sys.argv[3] if len(sys.argv) > 3 else "AI governance framework",
+        'current_year': str(datetime.now().year)
+    }
+    try:
+        AICouncilCrew().crew().test(n_iterations=int(sys.argv[1]), eval_llm=sys.argv[2], inputs=inputs)
+    except Exception as e:
+        print(f"\nError while testing the council: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+def topic_id(topic: str) -> str:
+    """Stable, filesystem-safe directory name for a topic"""
+    slug = re.sub(r'[^a-z0-9]+', '-', topic.lower()).strip('-')[:60]
+    return f"{slug}-{hashlib.sha1(topic.encode('utf-8')).hexdigest()[:8]}"
+
+def load_topics(path: str) -> List[str]:
+    """Reads one topic per line, skipping blank lines and # comments"""
+    with open(path, 'r', encoding='utf-8') as file:
+        topics = [line.strip() for line in file if line.strip() and not line.strip().startswith('#')]
+    return list(dict.fromkeys(topics))
+
+def completed_topics(results_path: str) -> Set[str]:
+    """Topics that already finished successfully in an earlier batch run"""
+    if not os.path.exists(results_path):
+        return set()
+    done = set()
+    with open(results_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A run that was killed mid-write can leave a partial last line
+            if result.get('status') == 'done':
+                done.add(result.get('topic'))
+    return done
+
+def batch():
+    """Evaluate every topic in a topic file, reusing council crews across topics
+
+    Usage: batch <topics file> [output dir]
+
+    Each worker builds one AICouncilCrew with all its agents and reuses it for every topic it picks up.
+    Crew memory is disabled so every topic is evaluated as it would be on its own.
+    Artifacts go to <output dir>/<topic id>/ and one JSON line per finished topic is appended to
+    <output dir>/results.jsonl as soon as it completes. Topics already marked done there are skipped,
+    so an interrupted batch can simply be restarted.
+    """
+    if len(sys.argv) < 2:
+        print("Usage: batch <topics file> [output dir]", file=sys.stderr)
+        sys.exit(1)
+
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else 'council_runs'
+    workers = int(os.getenv('COUNCIL_BATCH_WORKERS', 4))
+    results_path = os.path.join(output_dir, 'results.jsonl')
+    os.makedirs(output_dir, exist_ok=True)
+
+    done = completed_topics(results_path)
+    topics = [topic for topic in load_topics(sys.argv[1]) if topic not in done]
+    print(f"Evaluating {len(topics)} topics with {workers} workers ({len(done)} already done)")
+
+    local = threading.local()
+    build_lock = threading.Lock()
+
+    def evaluate(topic: str) -> Dict:
+        # Crews are not safe to share between concurrent kickoffs, so every worker thread keeps its own.
+        # They are built one at a time because setting up a crew is not thread-safe. Memory is off: it would
+        # carry earlier topics into later topics' prompts, and all workers would share one memory store.
+        if not hasattr(local, 'crew'):
+            with build_lock:
+                local.council = AICouncilCrew(output_dir=os.path.join(output_dir, '{topic_id}'), memory=False)
+                local.crew = local.council.crew()
+                local.usage = EventEmitter()
+        # The agents' token counters are never reset between kickoffs, so a topic's usage is what they spent
+        # since this snapshot, not the crew's running total.
+        agents = local.council.council_agents() + [local.council.manager_agent]
+        local.usage.usage_delta(agents)
+        started = time.monotonic()
+        result = {'topic': topic, 'topic_id': topic_id(topic)}
+        try:
+            local.crew.kickoff(inputs={
+                'topic': topic,
+                'topic_id': result['topic_id'],
+                'current_year': str(datetime.now().year)
+            })
+            result.update({
+                'status': 'done',
+                # CrewOutput.tasks_output drops tasks that finished before a group of async tasks, so read
+                # every task's own output instead.
+                'outputs': {task.name: task.output.raw for task in local.crew.tasks if task.output is not None},
+                'token_usage': local.usage.usage_delta(agents)
+            })
+        except Exception as e:
+            result.update({'status': 'failed', 'error': str(e)})
+        result['seconds'] = round(time.monotonic() - started, 2)
+        return result
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(evaluate, topic) for topic in topics]
+        for completed, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            with open(results_path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(result, default=str) + "\n")
+            failed += result['status'] != 'done'
+            print(f"[{completed}/{len(topics)}] {result['status']}: {result['topic']} ({result['seconds']}s)")
+
+    print(f"\n=== Batch Results ===\n{len(topics) - failed} of {len(topics)} topics evaluated, results in {results_path}")
+    sys.exit(0 if failed == 0 else 1)
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         topic = sys.argv[1]